@@ -19,6 +19,7 @@ YANDEX_TTS_ENDPOINT = 'tts.api.cloud.yandex.net:443'
 # OpenAI API settings  
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 OPENAI_MODEL = 'gpt-4o'  # Современная модель для разговоров
+USE_UVLOOP = os.getenv('USE_UVLOOP', '').lower() in ('1', 'true', 'yes')  # uvloop для asyncio-вызовов LLM
 
 # Audio settings
 CHUNK_SIZE = 4000
@@ -38,6 +39,7 @@ else:  # Linux/Mac
 VOICE = 'yulduz_ru'  # Женский русский голос
 VOICE_ROLE = 'friendly'  # Дружелюбная интонация
 VOICE_SPEED = 1.0  # Нормальная скорость для разговора
+TTS_CACHE_DIR = os.path.join(BASE_DIR, 'data', 'tts_cache')  # Кэш синтезированных фраз (WAV)
 
 # Language settings
 LANGUAGES = ['ru-RU', 'uz-UZ']  # Поддерживаемые языки
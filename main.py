@@ -75,6 +75,7 @@ class MedicalVoiceAssistant:
             
             print("  🔊 Настройка синтеза речи...")
             self.tts_service = TTSService(api_key=yandex_api_key)
+            TTSService.prewarm()
             
             print("  🧠 Настройка языковой модели...")
             self.llm_service = LangChainLLMService(api_key=openai_api_key)
@@ -181,22 +182,28 @@ class MedicalVoiceAssistant:
             logger.error(f"Ошибка генерации ответа: {e}")
             return "Извините, произошла техническая ошибка. Попробуйте переформулировать ваш запрос."
     
-    def speak_response(self, message: str):
-        """Произнести ответ."""
+    def speak_response(self, message: str, persist: bool = False):
+        """
+        Произнести ответ.
+        
+        Args:
+            message: Текст ответа
+            persist: Сохранить аудио в кэше на диске (только для фиксированных фраз)
+        """
         try:
             print(f"\n💬 {self.agent_name}: {message}")
             print("🔊 Произношу ответ...")
             
-            # Синтезируем речь
-            audio = self.tts_service.synthesize(
+            # Синтезируем речь по предложениям, проигрывая их по мере готовности
+            spoken = self.tts_service.synthesize_stream(
                 text=message,
                 voice=VOICE,
                 role=VOICE_ROLE,
-                speed=VOICE_SPEED
+                speed=VOICE_SPEED,
+                persist=persist
             )
             
-            if audio:
-                AudioPlayer.play_audio_segment(audio)
+            if spoken:
                 print("✅ Ответ произнесен")
             else:
                 print("❌ Не удалось произнести ответ")
@@ -228,7 +235,7 @@ class MedicalVoiceAssistant:
                              f"Меня зовут {self.agent_name}. Я помогу записаться на прием "
                              f"и отвечу на ваши вопросы. Чем могу помочь?")
             
-            self.speak_response(welcome_message)
+            self.speak_response(welcome_message, persist=True)
             
             conversation_count = 0
             
@@ -246,7 +253,7 @@ class MedicalVoiceAssistant:
                 if any(word in user_message.lower() for word in 
                        ['пока', 'до свидания', 'прощай', 'выход', 'хватит', 'стоп', 'спасибо за помощь']):
                     farewell = f"До свидания! Берегите здоровье и обращайтесь в медицинский центр {self.medical_center}, если понадобится помощь!"
-                    self.speak_response(farewell)
+                    self.speak_response(farewell, persist=True)
                     break
                 
                 # 2. Генерируем ответ
@@ -261,13 +268,13 @@ class MedicalVoiceAssistant:
                 if conversation_count >= 20:
                     reminder = ("Мы уже долго разговариваем. Если у вас есть еще вопросы, "
                                "обращайтесь в любое время. Берегите здоровье!")
-                    self.speak_response(reminder)
+                    self.speak_response(reminder, persist=True)
                     break
                 
         except KeyboardInterrupt:
             print("\n\n👋 Завершение работы...")
             farewell = "До свидания! Будьте здоровы!"
-            self.speak_response(farewell)
+            self.speak_response(farewell, persist=True)
         except Exception as e:
             logger.error(f"Ошибка в медицинском разговоре: {e}")
             print(f"💥 Произошла ошибка: {e}")
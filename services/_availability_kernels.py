@@ -0,0 +1,59 @@
+"""
+Ядро расчета свободных слотов записи для группы врачей на несколько дней.
+
+Записи на прием передаются параллельными массивами (врач, дата, время),
+результат - булева матрица (врач, день, слот). При наличии numba функция
+компилируется с параллельными циклами, иначе выполняется как обычный Python.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Заглушка декоратора numba.njit."""
+        return lambda func: func
+
+
+@njit(parallel=True, cache=True)
+def compute_availability(doctor_idx, date_ord, time_min, doc_row, start_ord,
+                         day_start, day_end, slot_minutes, out):
+    """
+    Заполнение матрицы свободных слотов.
+
+    Args:
+        doctor_idx: Индекс врача для каждой активной записи (int64)
+        date_ord: Порядковый номер даты каждой записи (date.toordinal, int64)
+        time_min: Время каждой записи в минутах от начала суток (int64)
+        doc_row: Строка матрицы для каждого индекса врача, -1 если врач не выбран
+        start_ord: Порядковый номер первого дня периода
+        day_start: Начало рабочего дня (строка, день) в минутах, -1 если выходной
+        day_end: Конец рабочего дня (строка, день) в минутах
+        slot_minutes: Длительность слота в минутах
+        out: Результат (строка, день, слот), True - слот свободен
+    """
+    n_rows, n_days, n_slots = out.shape
+
+    # Слоты внутри рабочих часов
+    for r in prange(n_rows):
+        for d in range(n_days):
+            s0 = day_start[r, d]
+            for s in range(n_slots):
+                out[r, d, s] = s0 >= 0 and s0 + slot_minutes * s < day_end[r, d]
+
+    # Исключаем занятые слоты
+    for i in prange(doctor_idx.shape[0]):
+        r = doc_row[doctor_idx[i]]
+        d = date_ord[i] - start_ord
+        if r < 0 or d < 0 or d >= n_days:
+            continue
+
+        offset = time_min[i] - day_start[r, d]
+        if day_start[r, d] >= 0 and offset >= 0 and offset % slot_minutes == 0:
+            s = offset // slot_minutes
+            if s < n_slots:
+                out[r, d, s] = False
@@ -0,0 +1,128 @@
+"""
+Streaming Ogg Opus encoder for microphone audio.
+
+Raw int16 PCM is encoded into 20 ms Opus packets with opuslib and wrapped in
+Ogg pages, the container SpeechKit accepts as OGG_OPUS. Without opuslib the
+module is unavailable (HAS_OPUS = False) and callers send LINEAR16 PCM.
+"""
+import struct
+from typing import List
+
+try:
+    import opuslib
+    HAS_OPUS = True
+except ImportError:
+    HAS_OPUS = False
+
+# Opus frame length; 20 ms is the recommended size for speech
+FRAME_MS = 20
+
+# Ogg Opus granule positions are always counted at 48 kHz
+GRANULE_RATE = 48000
+
+# Encoder lookahead reported in the OpusHead header, in 48 kHz samples
+PRE_SKIP = 312
+
+# Maximum number of lacing values in one Ogg page
+MAX_SEGMENTS = 255
+
+
+def _make_crc_table() -> List[int]:
+    """CRC-32 table for the Ogg polynomial (0x04C11DB7, no reflection)."""
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+def _ogg_crc(data: bytes) -> int:
+    """Checksum of an Ogg page."""
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[(crc >> 24) ^ byte]
+    return crc
+
+
+class OggOpusEncoder:
+    """Encodes a PCM stream into Ogg Opus pages chunk by chunk."""
+
+    def __init__(self, rate: int, channels: int, serial: int = 1):
+        """
+        Args:
+            rate: Sample rate of the input PCM (8, 12, 16, 24 or 48 kHz)
+            channels: Number of input channels
+            serial: Ogg logical stream serial number
+        """
+        self.rate = rate
+        self.channels = channels
+        self.serial = serial
+        self.frame_samples = rate * FRAME_MS // 1000
+        self.frame_bytes = self.frame_samples * channels * 2
+
+        self._encoder = opuslib.Encoder(rate, channels, opuslib.APPLICATION_VOIP)
+        self._pending = bytearray()
+        self._page_seq = 0
+        self._granule = 0
+
+    def header(self) -> bytes:
+        """Identification and comment pages that start the stream."""
+        opus_head = b"OpusHead" + struct.pack("<BBHIhB", 1, self.channels, PRE_SKIP, self.rate, 0, 0)
+        vendor = b"opuslib"
+        opus_tags = b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", 0)
+        return self._page([opus_head], 0, bos=True) + self._page([opus_tags], 0)
+
+    def encode(self, pcm: bytes) -> bytes:
+        """
+        Encode PCM into Ogg pages.
+
+        Samples that do not fill a whole Opus frame are kept for the next call.
+
+        Args:
+            pcm: Interleaved int16 little-endian PCM
+
+        Returns:
+            Ogg pages with the encoded frames (empty if no full frame yet)
+        """
+        self._pending += pcm
+        packets = []
+        while len(self._pending) >= self.frame_bytes:
+            frame = bytes(self._pending[:self.frame_bytes])
+            del self._pending[:self.frame_bytes]
+            packets.append(self._encoder.encode(frame, self.frame_samples))
+
+        pages = []
+        step = self.frame_samples * GRANULE_RATE // self.rate
+        start = 0
+        while start < len(packets):
+            # Each packet takes len // 255 + 1 lacing values
+            end, segments = start, 0
+            while end < len(packets) and segments + len(packets[end]) // 255 + 1 <= MAX_SEGMENTS:
+                segments += len(packets[end]) // 255 + 1
+                end += 1
+            self._granule += step * (end - start)
+            pages.append(self._page(packets[start:end], self._granule))
+            start = end
+
+        return b"".join(pages)
+
+    def _page(self, packets: List[bytes], granule: int, bos: bool = False) -> bytes:
+        """Build one Ogg page holding whole packets."""
+        lacing = bytearray()
+        for packet in packets:
+            lacing += b"\xff" * (len(packet) // 255) + bytes((len(packet) % 255,))
+
+        header = struct.pack(
+            "<4sBBqIIIB", b"OggS", 0, 0x02 if bos else 0,
+            granule, self.serial, self._page_seq, 0, len(lacing)
+        )
+        self._page_seq += 1
+
+        page = bytearray(header + lacing + b"".join(packets))
+        page[22:26] = struct.pack("<I", _ogg_crc(page))
+        return bytes(page)
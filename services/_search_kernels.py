@@ -0,0 +1,116 @@
+"""
+Ядра поиска подстроки по каталогу услуг и врачей.
+
+Строки поиска всех записей склеиваются в один буфер байтов с таблицей
+смещений. Поиск выполняется одним проходом по буферу: при наличии numba -
+JIT-скомпилированным алгоритмом Бойера-Мура-Хорспула, иначе через bytes.find.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Разделитель записей в буфере (не встречается в поисковых запросах)
+RECORD_SEPARATOR = b"\x00"
+
+
+def build_catalog(search_strings: List[str]) -> Tuple[bytes, np.ndarray]:
+    """
+    Склейка строк поиска в один буфер.
+
+    Args:
+        search_strings: Строки поиска записей (уже в нижнем регистре)
+
+    Returns:
+        Буфер байтов и массив смещений начала каждой записи
+        (последний элемент - конец буфера плюс разделитель)
+    """
+    encoded = [text.encode("utf-8") for text in search_strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(chunk) + len(RECORD_SEPARATOR) for chunk in encoded], out=offsets[1:])
+    return RECORD_SEPARATOR.join(encoded), offsets
+
+
+def _find_records_py(buf: bytes, offsets: np.ndarray, pat: bytes) -> np.ndarray:
+    """Поиск записей, содержащих pat, через bytes.find."""
+    bounds = offsets.tolist()
+    found = []
+    record = 0
+    pos = buf.find(pat)
+
+    while pos != -1:
+        while bounds[record + 1] <= pos:
+            record += 1
+        found.append(record)
+        # Одного совпадения достаточно - продолжаем со следующей записи
+        pos = buf.find(pat, bounds[record + 1])
+
+    return np.array(found, dtype=np.int64)
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _find_records_jit(buf, offsets, pat):
+        """Поиск записей, содержащих pat, алгоритмом Бойера-Мура-Хорспула."""
+        n = buf.shape[0]
+        m = pat.shape[0]
+        n_records = offsets.shape[0] - 1
+
+        if m == 0:
+            return np.arange(n_records)
+
+        out = np.empty(n_records, dtype=np.int64)
+        count = 0
+
+        shift = np.full(256, m, dtype=np.int64)
+        for k in range(m - 1):
+            shift[pat[k]] = m - 1 - k
+
+        record = 0
+        pos = 0
+        while pos <= n - m:
+            j = m - 1
+            while j >= 0 and buf[pos + j] == pat[j]:
+                j -= 1
+
+            if j < 0:
+                while offsets[record + 1] <= pos:
+                    record += 1
+                out[count] = record
+                count += 1
+                pos = offsets[record + 1]
+            else:
+                pos += shift[buf[pos + m - 1]]
+
+        return out[:count]
+
+
+def find_records(buf: bytes, offsets: np.ndarray, pat: bytes) -> np.ndarray:
+    """
+    Поиск записей каталога, содержащих подстроку.
+
+    Args:
+        buf: Буфер каталога из build_catalog
+        offsets: Смещения записей из build_catalog
+        pat: Искомая подстрока в UTF-8
+
+    Returns:
+        Индексы найденных записей по возрастанию
+    """
+    if len(offsets) <= 1 or RECORD_SEPARATOR in pat:
+        return np.empty(0, dtype=np.int64)
+
+    if HAS_NUMBA:
+        return _find_records_jit(
+            np.frombuffer(buf, dtype=np.uint8),
+            offsets,
+            np.frombuffer(pat, dtype=np.uint8)
+        )
+
+    return _find_records_py(buf, offsets, pat)
@@ -0,0 +1,138 @@
+"""
+Сжатый индекс ближайших соседей для большой базы знаний.
+
+Векторы коллекции Chroma квантуются FAISS IndexIVFPQ (инвертированные списки
+плюс произведение квантователей) и сохраняются на диск; для поиска индекс
+отображается в память только для чтения. Без faiss модуль недоступен
+(HAS_FAISS = False), и поиск выполняется средствами Chroma.
+"""
+import os
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    import faiss
+    HAS_FAISS = True
+except ImportError:
+    HAS_FAISS = False
+
+logger = logging.getLogger(__name__)
+
+# Минимум векторов, с которого индекс IVF-PQ имеет смысл (меньше - хватает Chroma)
+MIN_VECTORS = 10000
+
+# Число подвекторов PQ и бит на код подвектора
+PQ_SUBQUANTIZERS = 64
+PQ_BITS = 8
+
+# Сколько инвертированных списков просматривать при поиске
+NPROBE = 16
+
+# Обучающих векторов на один инвертированный список (рекомендация FAISS - от 39)
+TRAIN_POINTS_PER_LIST = 64
+
+
+class IVFPQIndex:
+    """Индекс IVF-PQ над векторами коллекции с отображением файла в память."""
+
+    def __init__(self, index_path: str):
+        """
+        Args:
+            index_path: Путь к файлу индекса; рядом хранится файл с ID записей
+        """
+        self.index_path = index_path
+        self.ids_path = index_path + ".ids.npy"
+        self._index = None
+        self._ids: Optional[np.ndarray] = None
+
+    @property
+    def size(self) -> int:
+        """Количество векторов в загруженном индексе."""
+        return 0 if self._index is None else self._index.ntotal
+
+    def load(self) -> bool:
+        """
+        Отображение сохраненного индекса в память.
+
+        Returns:
+            True если индекс загружен
+        """
+        if not HAS_FAISS or not os.path.exists(self.index_path) or not os.path.exists(self.ids_path):
+            return False
+
+        try:
+            self._index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            self._index.nprobe = NPROBE
+            self._ids = np.load(self.ids_path, mmap_mode="r")
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить индекс IVF-PQ: {e}")
+            self._index = None
+            self._ids = None
+            return False
+
+    def build(self, ids: List[str], vectors: np.ndarray) -> bool:
+        """
+        Обучение, заполнение и сохранение индекса, затем его загрузка.
+
+        Args:
+            ids: ID записей коллекции
+            vectors: Векторы записей (n, d), float32
+
+        Returns:
+            True если индекс построен
+        """
+        n, dim = vectors.shape
+        if not HAS_FAISS or n < MIN_VECTORS or dim % PQ_SUBQUANTIZERS:
+            return False
+
+        # ~4*sqrt(n) списков, но не больше, чем позволяет обучающая выборка
+        nlist = max(1, min(int(4 * np.sqrt(n)), n // TRAIN_POINTS_PER_LIST))
+
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_SUBQUANTIZERS, PQ_BITS)
+
+        train_size = min(n, nlist * TRAIN_POINTS_PER_LIST * 4)
+        sample = vectors[np.random.default_rng(0).choice(n, train_size, replace=False)]
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+        index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+
+        # Пишем во временные файлы и атомарно подменяем, чтобы не портить отображенный индекс
+        faiss.write_index(index, self.index_path + ".tmp")
+        with open(self.ids_path + ".tmp", "wb") as f:
+            np.save(f, np.array(ids))
+        self._index = None
+        self._ids = None
+        os.replace(self.index_path + ".tmp", self.index_path)
+        os.replace(self.ids_path + ".tmp", self.ids_path)
+
+        logger.info(f"Построен индекс IVF-PQ: {n} векторов, {nlist} списков")
+        return self.load()
+
+    def search(self, vector: List[float], k: int) -> List[str]:
+        """
+        Поиск ближайших записей.
+
+        Args:
+            vector: Вектор запроса
+            k: Количество результатов
+
+        Returns:
+            ID найденных записей по возрастанию расстояния
+        """
+        if self._index is None:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        _, positions = self._index.search(query, k)
+        return [str(self._ids[pos]) for pos in positions[0] if pos >= 0]
+
+    def clear(self):
+        """Удаление индекса с диска."""
+        self._index = None
+        self._ids = None
+        for path in (self.index_path, self.ids_path):
+            if os.path.exists(path):
+                os.remove(path)
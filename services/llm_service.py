@@ -4,18 +4,69 @@ LLM service using LangChain for better prompt management and control.
 import os
 import logging
 import time
+from functools import cached_property, lru_cache
 from typing import Optional, Dict, List, Union, Any
 
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 
-from config.settings import OPENAI_API_KEY, OPENAI_MODEL
+from config.settings import OPENAI_API_KEY, OPENAI_MODEL, USE_UVLOOP
 
 logger = logging.getLogger(__name__)
 
+# Optional uvloop event loop for async LLM calls (enabled with USE_UVLOOP=1)
+if USE_UVLOOP:
+    try:
+        import uvloop
+        uvloop.install()
+        logger.debug("uvloop event loop policy installed")
+    except ImportError:
+        pass
+
+# langchain_openai is heavy to import, so load it only when the first model is created
+_ChatOpenAI = None
+
+
+def _get_chat_openai_cls():
+    """Lazily import the ChatOpenAI class."""
+    global _ChatOpenAI
+    if _ChatOpenAI is None:
+        from langchain_openai import ChatOpenAI
+        _ChatOpenAI = ChatOpenAI
+    return _ChatOpenAI
+
+
+@lru_cache(maxsize=256)
+def _build_prompt(system_template: str) -> ChatPromptTemplate:
+    """Build (and cache) a system + user prompt template for the given system prompt."""
+    return ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(system_template),
+        HumanMessagePromptTemplate.from_template("{user_input}")
+    ])
+
+
+@lru_cache(maxsize=256)
+def _build_constraint_prompt(allowed_topics: tuple, forbidden_topics: tuple) -> str:
+    """Render (and cache) the system prompt for a topic-constrained chain."""
+    allowed_str = ", ".join(allowed_topics)
+    forbidden_str = ", ".join(forbidden_topics) if forbidden_topics else "нет запрещенных тем"
+    
+    return f"""Ты ограниченный помощник, который может говорить ТОЛЬКО на следующие темы: {allowed_str}.
+
+        ЗАПРЕЩЕННЫЕ темы: {forbidden_str}
+
+        ПРАВИЛА:
+        1. Если пользователь спрашивает о разрешенных темах - отвечай кратко и по делу
+        2. Если вопрос НЕ относится к разрешенным темам - вежливо откажись и предложи поговорить на разрешенные темы
+        3. Всегда отвечай максимум 1-2 предложения
+        4. Будь дружелюбной, но соблюдай ограничения
+
+        Твое имя {{agent_name}}.
+        """
+
+
 class LangChainLLMService:
     """LLM service using LangChain for advanced prompt management."""
     
@@ -23,26 +74,34 @@ class LangChainLLMService:
         """
         Initialize LangChain LLM service.
         
+        Async calls (ainvoke) run on the default asyncio loop; set USE_UVLOOP=1
+        and install uvloop to use it as a faster event loop.
+        
         Args:
             api_key: OpenAI API key
             model: Model identifier (default: gpt-4o)
         """
         self.api_key = api_key or OPENAI_API_KEY
         self.model = model or OPENAI_MODEL
-        self.llm = None
-        self.default_chain = None
         self.custom_chains = {}
         
-        self._init_llm()
-        self._setup_default_chain()
+        if not self.api_key:
+            raise ValueError("API key not provided")
+    
+    @cached_property
+    def llm(self):
+        """Default LLM, created on first access."""
+        return self._init_llm()
+    
+    @cached_property
+    def default_chain(self):
+        """Default conversation chain, created on first access."""
+        return self._setup_default_chain()
         
     def _init_llm(self):
         """Initialize the LangChain ChatOpenAI model."""
-        if not self.api_key:
-            raise ValueError("API key not provided")
-            
         try:
-            self.llm = ChatOpenAI(
+            llm = _get_chat_openai_cls()(
                 api_key=self.api_key,
                 model=self.model,
                 temperature=0.7,
@@ -50,6 +109,7 @@ class LangChainLLMService:
                 timeout=30
             )
             logger.debug(f"Initialized LangChain LLM with model: {self.model}")
+            return llm
         except Exception as e:
             logger.error(f"Failed to initialize LangChain LLM: {str(e)}")
             raise
@@ -66,15 +126,13 @@ class LangChainLLMService:
         ВАЖНО: Всегда отвечай коротко и по делу!"""
         
         # Create prompt template
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessagePromptTemplate.from_template(system_template),
-            HumanMessagePromptTemplate.from_template("{user_input}")
-        ])
+        prompt = _build_prompt(system_template)
         
         # Create the chain
-        self.default_chain = prompt | self.llm | StrOutputParser()
+        chain = prompt | self.llm | StrOutputParser()
         
         logger.debug("Default conversation chain setup complete")
+        return chain
     
     def create_custom_chain(self, chain_name: str, system_prompt: str, 
                           temperature: float = 0.7, max_tokens: int = 150):
@@ -89,7 +147,7 @@ class LangChainLLMService:
         """
         try:
             # Create LLM with custom parameters
-            custom_llm = ChatOpenAI(
+            custom_llm = _get_chat_openai_cls()(
                 api_key=self.api_key,
                 model=self.model,
                 temperature=temperature,
@@ -97,11 +155,8 @@ class LangChainLLMService:
                 timeout=30
             )
             
-            # Create prompt template
-            prompt = ChatPromptTemplate.from_messages([
-                SystemMessagePromptTemplate.from_template(system_prompt),
-                HumanMessagePromptTemplate.from_template("{user_input}")
-            ])
+            # Create prompt template (cached by system prompt)
+            prompt = _build_prompt(system_prompt)
             
             # Create and store the chain
             chain = prompt | custom_llm | StrOutputParser()
@@ -233,22 +288,8 @@ class LangChainLLMService:
         """
         forbidden_topics = forbidden_topics or []
         
-        # Create constraint system prompt
-        allowed_str = ", ".join(allowed_topics)
-        forbidden_str = ", ".join(forbidden_topics) if forbidden_topics else "нет запрещенных тем"
-        
-        constraint_prompt = f"""Ты ограниченный помощник, который может говорить ТОЛЬКО на следующие темы: {allowed_str}.
-
-        ЗАПРЕЩЕННЫЕ темы: {forbidden_str}
-
-        ПРАВИЛА:
-        1. Если пользователь спрашивает о разрешенных темах - отвечай кратко и по делу
-        2. Если вопрос НЕ относится к разрешенным темам - вежливо откажись и предложи поговорить на разрешенные темы
-        3. Всегда отвечай максимум 1-2 предложения
-        4. Будь дружелюбной, но соблюдай ограничения
-
-        Твое имя {{agent_name}}.
-        """
+        # Create constraint system prompt (cached by topic lists)
+        constraint_prompt = _build_constraint_prompt(tuple(allowed_topics), tuple(forbidden_topics))
         
         return self.create_custom_chain(
             chain_name=chain_name,
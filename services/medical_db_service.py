@@ -2,17 +2,353 @@
 Сервис для работы с медицинской базой данных центра.
 """
 import os
-import json
+import re
+import sys
+import mmap
+import copy
+import time
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Set, Tuple, ClassVar
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import numpy as np
+import orjson
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from services._availability_kernels import compute_availability
+from services._search_kernels import build_catalog, find_records
+
 logger = logging.getLogger(__name__)
 
+# Размер журнала изменений, после которого он сворачивается в основной файл
+JOURNAL_COMPACT_SIZE = 1024 * 1024
+
+# Все, кроме цифр, в номере телефона
+_NON_DIGITS_RE = re.compile(r"\D")
+
+# fdatasync есть не на всех платформах (нет на Windows и macOS)
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
+# Окно объединения записей журнала перед fsync, секунд
+WRITE_COALESCE_DELAY = 0.05
+
+# Пауза между попытками взять блокировку через msvcrt, секунд
+_MSVCRT_LOCK_RETRY = 0.01
+
+# Шаг временных слотов записи, минут
+SLOT_MINUTES = 30
+
+# Ключи дней недели в расписании в порядке datetime.weekday()
+_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+# Примеры данных для пустой базы (копируются при создании)
+_SAMPLE_SERVICES = (
+    {
+        "id": "therapy_consult",
+        "name": "Консультация терапевта",
+        "category": "therapy",
+        "price": 2500,
+        "duration": 30,
+        "description": "Первичная консультация врача-терапевта",
+        "preparation": "Особой подготовки не требуется"
+    },
+    {
+        "id": "therapy_repeat",
+        "name": "Повторная консультация терапевта",
+        "category": "therapy",
+        "price": 2000,
+        "duration": 20,
+        "description": "Повторный прием врача-терапевта"
+    },
+    {
+        "id": "cardio_consult",
+        "name": "Консультация кардиолога",
+        "category": "cardiology",
+        "price": 3000,
+        "duration": 40,
+        "description": "Консультация врача-кардиолога"
+    },
+    {
+        "id": "neuro_consult",
+        "name": "Консультация невролога",
+        "category": "neurology",
+        "price": 2800,
+        "duration": 35,
+        "description": "Консультация врача-невролога"
+    },
+    {
+        "id": "gyneco_consult",
+        "name": "Консультация гинеколога",
+        "category": "gynecology",
+        "price": 2500,
+        "duration": 30,
+        "description": "Консультация врача-гинеколога"
+    },
+    {
+        "id": "urology_consult",
+        "name": "Консультация уролога",
+        "category": "urology",
+        "price": 2700,
+        "duration": 30,
+        "description": "Консультация врача-уролога"
+    },
+    {
+        "id": "pediatric_consult",
+        "name": "Консультация педиатра",
+        "category": "pediatrics",
+        "price": 2200,
+        "duration": 30,
+        "description": "Консультация врача-педиатра"
+    },
+    {
+        "id": "ecg",
+        "name": "ЭКГ с расшифровкой",
+        "category": "diagnostics",
+        "price": 800,
+        "duration": 15,
+        "description": "Электрокардиография с расшифровкой"
+    },
+    {
+        "id": "echo_heart",
+        "name": "УЗИ сердца (ЭхоКГ)",
+        "category": "diagnostics",
+        "price": 2800,
+        "duration": 30,
+        "description": "Ультразвуковое исследование сердца"
+    },
+    {
+        "id": "blood_general",
+        "name": "Общий анализ крови",
+        "category": "laboratory",
+        "price": 500,
+        "duration": 10,
+        "description": "Общий клинический анализ крови",
+        "preparation": "Сдается натощак утром"
+    },
+    {
+        "id": "blood_biochem",
+        "name": "Биохимический анализ крови",
+        "category": "laboratory",
+        "price": 1200,
+        "duration": 10,
+        "description": "Биохимическое исследование крови",
+        "preparation": "12-часовое голодание перед сдачей"
+    },
+    {
+        "id": "urine_general",
+        "name": "Общий анализ мочи",
+        "category": "laboratory",
+        "price": 400,
+        "duration": 5,
+        "description": "Общий клинический анализ мочи",
+        "preparation": "Утренняя порция мочи, средний поток"
+    }
+)
+
+_SAMPLE_DOCTORS = (
+    {
+        "id": "ivanova_ap",
+        "name": "Иванова Анна Петровна",
+        "specialty": "therapy",
+        "position": "Врач-терапевт",
+        "experience": 15,
+        "education": "ТГМИ, 2009",
+        "room": "101"
+    },
+    {
+        "id": "petrov_sm",
+        "name": "Петров Сергей Михайлович",
+        "specialty": "therapy",
+        "position": "Врач-терапевт высшей категории",
+        "experience": 20,
+        "education": "ТГМИ, 2004",
+        "room": "102"
+    },
+    {
+        "id": "sidorova_ev",
+        "name": "Сидорова Елена Владимировна",
+        "specialty": "cardiology",
+        "position": "Врач-кардиолог",
+        "experience": 12,
+        "education": "ТГМИ, 2012",
+        "room": "201"
+    },
+    {
+        "id": "mikhailov_ik",
+        "name": "Михайлов Игорь Константинович",
+        "specialty": "cardiology",
+        "position": "Врач-кардиолог высшей категории",
+        "experience": 25,
+        "education": "ТГМИ, 1999",
+        "room": "202"
+    },
+    {
+        "id": "kozlova_ma",
+        "name": "Козлова Мария Александровна",
+        "specialty": "neurology",
+        "position": "Врач-невролог",
+        "experience": 10,
+        "education": "ТГМИ, 2014",
+        "room": "301"
+    },
+    {
+        "id": "fedorov_ds",
+        "name": "Федоров Дмитрий Сергеевич",
+        "specialty": "neurology",
+        "position": "Врач-невролог",
+        "experience": 8,
+        "education": "ТГМИ, 2016",
+        "room": "302"
+    },
+    {
+        "id": "romanova_li",
+        "name": "Романова Людмила Ивановна",
+        "specialty": "gynecology",
+        "position": "Врач-гинеколог",
+        "experience": 18,
+        "education": "ТГМИ, 2006",
+        "room": "401"
+    },
+    {
+        "id": "nikolaeva_op",
+        "name": "Николаева Ольга Павловна",
+        "specialty": "gynecology",
+        "position": "Врач-гинеколог высшей категории",
+        "experience": 22,
+        "education": "ТГМИ, 2002",
+        "room": "402"
+    }
+)
+
+_SAMPLE_SCHEDULE = {
+    "ivanova_ap": {
+        "monday": {"start": "09:00", "end": "15:00"},
+        "wednesday": {"start": "09:00", "end": "15:00"},
+        "friday": {"start": "09:00", "end": "15:00"}
+    },
+    "petrov_sm": {
+        "tuesday": {"start": "10:00", "end": "16:00"},
+        "thursday": {"start": "10:00", "end": "16:00"},
+        "saturday": {"start": "09:00", "end": "13:00"}
+    },
+    "sidorova_ev": {
+        "monday": {"start": "14:00", "end": "19:00"},
+        "wednesday": {"start": "14:00", "end": "19:00"}
+    },
+    "mikhailov_ik": {
+        "tuesday": {"start": "09:00", "end": "14:00"},
+        "thursday": {"start": "09:00", "end": "14:00"},
+        "friday": {"start": "09:00", "end": "14:00"}
+    },
+    "kozlova_ma": {
+        "monday": {"start": "10:00", "end": "16:00"},
+        "tuesday": {"start": "10:00", "end": "16:00"},
+        "thursday": {"start": "10:00", "end": "16:00"}
+    },
+    "fedorov_ds": {
+        "wednesday": {"start": "14:00", "end": "20:00"},
+        "friday": {"start": "14:00", "end": "20:00"}
+    },
+    "romanova_li": {
+        "tuesday": {"start": "09:00", "end": "15:00"},
+        "thursday": {"start": "09:00", "end": "15:00"},
+        "saturday": {"start": "09:00", "end": "15:00"}
+    },
+    "nikolaeva_op": {
+        "monday": {"start": "13:00", "end": "19:00"},
+        "wednesday": {"start": "13:00", "end": "19:00"},
+        "friday": {"start": "13:00", "end": "19:00"}
+    }
+}
+
+
+def _hhmm_to_min(value: str) -> int:
+    """Перевод времени "HH:MM" в минуты от начала суток."""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _min_to_hhmm(value: int) -> str:
+    """Перевод минут от начала суток во время "HH:MM"."""
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+def _norm_phone(phone: Optional[str]) -> str:
+    """Нормализация номера телефона: только цифры ("+7 (495) 1" -> "74951")."""
+    return _NON_DIGITS_RE.sub("", phone or "")
+
+
+def _parse_date(date: str) -> datetime:
+    """Разбор даты "YYYY-MM-DD"."""
+    year, month, day = date.split("-")
+    return datetime(int(year), int(month), int(day))
+
+
+def _weekday_of(date: str) -> str:
+    """Ключ дня недели в расписании для даты "YYYY-MM-DD"."""
+    return _WEEKDAYS[_parse_date(date).weekday()]
+
+
+def _next_id(records: List[Dict[str, Any]]) -> int:
+    """Следующий номер для ID вида "prefix_000001" (максимальный номер + 1)."""
+    last = 0
+    for record in records:
+        _, _, number = str(record.get("id", "")).rpartition("_")
+        if number.isdigit():
+            last = max(last, int(number))
+    return last + 1
+
+
+def _lock_file(fd: int, exclusive: bool):
+    """Захват межпроцессной блокировки файла (ожидает освобождения)."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return
+    
+    # msvcrt не поддерживает разделяемые блокировки - всегда исключительная
+    os.lseek(fd, 0, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return
+        except OSError:
+            time.sleep(_MSVCRT_LOCK_RETRY)
+
+
+def _unlock_file(fd: int):
+    """Освобождение межпроцессной блокировки файла."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Признак версии файла (inode, mtime, размер) или None, если файла нет."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
 class MedicalDBService:
     """Сервис для работы с базой данных медицинского центра."""
     
+    # Путь к базе по умолчанию, вычисляется один раз на процесс
+    _DEFAULT_DB_PATH: ClassVar[Optional[str]] = None
+    
     def __init__(self, db_path: str = None):
         """
         Инициализация сервиса.
@@ -21,6 +357,7 @@ class MedicalDBService:
             db_path: Путь к файлу базы данных
         """
         self.db_path = db_path or self._get_default_db_path()
+        self._journal_path = self.db_path + ".log"
         self.data = {
             "services": [],
             "doctors": [],
@@ -29,26 +366,108 @@ class MedicalDBService:
             "patients": []
         }
         
+        # Разделы данных, связанные с self.data по ссылке (см. _bind_sections)
+        self.services: List[Dict[str, Any]] = []
+        self.doctors: List[Dict[str, Any]] = []
+        self.schedule: Dict[str, Any] = {}
+        self.appointments: List[Dict[str, Any]] = []
+        self.patients: List[Dict[str, Any]] = []
+        
+        # Индексы для быстрого поиска (строятся в _rebuild_indexes)
+        self._services_by_id: Dict[str, Dict[str, Any]] = {}
+        self._doctors_by_id: Dict[str, Dict[str, Any]] = {}
+        self._patients_by_phone: Dict[str, Dict[str, Any]] = {}
+        self._appointments_by_id: Dict[str, Dict[str, Any]] = {}
+        self._appt_index: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._appts_by_date: Dict[str, List[Dict[str, Any]]] = {}
+        self._schedule_minutes: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._appts_np: Optional[Dict[str, np.ndarray]] = None
+        self._status_counts: Counter = Counter()
+        self._specialty_counts: Counter = Counter()
+        self._next_appt_id = 1
+        self._next_patient_id = 1
+        self._services_buf, self._services_offsets = build_catalog([])
+        self._doctors_buf, self._doctors_offsets = build_catalog([])
+        
+        # Изменения данных выполняются под блокировкой, а fsync журнала и
+        # сворачивание его в снимок - в фоновом потоке записи
+        self._lock = threading.RLock()
+        self._dirty = threading.Event()
+        self._closing = False
+        
+        # Несколько процессов (воркеров) делят одну базу: изменения идут под
+        # исключительной блокировкой файла .lock, чтение с диска - под разделяемой.
+        # Перед работой процесс подхватывает чужие изменения из снимка и журнала.
+        self._lock_fd = os.open(self.db_path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock_depth = 0
+        self._snapshot_sig: Optional[Tuple[int, int, int]] = None
+        self._journal_pos = 0
+        
+        # Закодированные разделы последнего снимка: при сохранении заново
+        # сериализуются только разделы из _dirty_sections
+        self._section_cache: Dict[str, bytes] = {}
+        self._dirty_sections: Set[str] = set()
+        
         self._load_data()
+        self._journal = open(self._journal_path, "ab", buffering=0)
         self._ensure_sample_data()
+        
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
     
     def _get_default_db_path(self) -> str:
         """Получить путь к базе данных по умолчанию."""
-        current_dir = Path(__file__).resolve().parent.parent
-        data_dir = current_dir / "data" / "database"
-        data_dir.mkdir(parents=True, exist_ok=True)
-        return str(data_dir / "medical_center.json")
+        if MedicalDBService._DEFAULT_DB_PATH is None:
+            current_dir = Path(__file__).resolve().parent.parent
+            data_dir = current_dir / "data" / "database"
+            data_dir.mkdir(parents=True, exist_ok=True)
+            MedicalDBService._DEFAULT_DB_PATH = str(data_dir / "medical_center.json")
+        return MedicalDBService._DEFAULT_DB_PATH
+    
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True):
+        """
+        Межпроцессная блокировка базы (повторно входимая внутри процесса).
+        
+        Args:
+            exclusive: True - исключительная (изменение), False - разделяемая (чтение)
+        """
+        with self._lock:
+            if self._lock_depth == 0:
+                _lock_file(self._lock_fd, exclusive)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    _unlock_file(self._lock_fd)
     
     def _load_data(self):
         """Загрузка данных из файла."""
+        with self._file_lock(exclusive=False):
+            self._read_snapshot()
+    
+    def _read_snapshot(self):
+        """Чтение снимка базы и журнала (вызывается под файловой блокировкой)."""
+        self._snapshot_sig = _file_signature(self.db_path)
+        self._journal_pos = 0
+        self._section_cache.clear()
         try:
             if os.path.exists(self.db_path):
-                with open(self.db_path, 'r', encoding='utf-8') as f:
-                    self.data = json.load(f)
+                # Разбираем JSON прямо из отображенного в память файла, без копии в bytes
+                fd = os.open(self.db_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+                try:
+                    if os.fstat(fd).st_size:
+                        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                            with memoryview(mm) as view:
+                                self.data = orjson.loads(view)
+                finally:
+                    os.close(fd)
                 logger.info(f"Данные загружены из {self.db_path}")
+                self._replay_journal()
             else:
                 logger.info("Файл базы данных не найден, создается новый")
-                self._save_data()
         except Exception as e:
             logger.error(f"Ошибка загрузки данных: {e}")
             self.data = {
@@ -59,260 +478,352 @@ class MedicalDBService:
                 "patients": []
             }
     
+    def _refresh(self):
+        """Подхват изменений, сделанных другими процессами (под файловой блокировкой)."""
+        journal_sig = _file_signature(self._journal_path)
+        journal_size = journal_sig[2] if journal_sig else 0
+        
+        if _file_signature(self.db_path) != self._snapshot_sig or journal_size < self._journal_pos:
+            # Снимок перезаписан (журнал свернут) - перечитываем базу целиком
+            self._read_snapshot()
+            self._rebuild_indexes()
+        elif journal_size > self._journal_pos:
+            self._replay_journal(self._journal_pos)
+            self._rebuild_indexes()
+    
+    def _sync(self):
+        """Подхват чужих изменений перед чтением данных."""
+        with self._file_lock(exclusive=False):
+            self._refresh()
+    
     def _save_data(self):
-        """Сохранение данных в файл."""
+        """Сохранение данных в файл (через временный файл и атомарную замену)."""
+        tmp_path = self.db_path + ".tmp"
         try:
-            with open(self.db_path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-            logger.debug("Данные сохранены в базу")
+            with self._file_lock():
+                payload = memoryview(self._encode_snapshot())
+                
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+                try:
+                    while payload:
+                        payload = payload[os.write(fd, payload):]
+                    _fdatasync(fd)
+                finally:
+                    os.close(fd)
+                
+                os.replace(tmp_path, self.db_path)
+                self._snapshot_sig = _file_signature(self.db_path)
+                logger.debug("Данные сохранены в базу")
+                return True
         except Exception as e:
             logger.error(f"Ошибка сохранения данных: {e}")
+            return False
+    
+    def _encode_snapshot(self) -> bytes:
+        """
+        Сериализация базы из закэшированных разделов.
+        
+        Результат совпадает с orjson.dumps(self.data, option=OPT_INDENT_2),
+        но неизмененные разделы повторно не кодируются.
+        
+        Returns:
+            JSON снимка базы
+        """
+        cache = self._section_cache
+        for name in self._dirty_sections:
+            cache.pop(name, None)
+        self._dirty_sections.clear()
+        
+        parts = []
+        for name, section in self.data.items():
+            fragment = cache.get(name)
+            if fragment is None:
+                # Переводы строк в JSON встречаются только между элементами,
+                # поэтому отступ второго уровня добавляется простой заменой
+                fragment = orjson.dumps(section, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  ")
+                cache[name] = fragment
+            parts.append(b'  ' + orjson.dumps(name) + b': ' + fragment)
+        
+        if not parts:
+            return b"{}"
+        return b"{\n" + b",\n".join(parts) + b"\n}"
+    
+    def _append_journal(self, op: str, payload: Dict[str, Any]):
+        """
+        Запись изменения в журнал (одна строка JSON на операцию).
+        
+        Args:
+            op: Тип операции (add_appointment, cancel_appointment, add_patient)
+            payload: Данные операции
+        """
+        record = {"op": op, "ts": datetime.now().isoformat(), "data": payload}
+        self._journal.write(orjson.dumps(record) + b"\n")
+        # Вызывается под исключительной блокировкой, поэтому конец журнала - наш
+        self._journal_pos = self._journal.tell()
+        self._dirty.set()
+    
+    def _writer_loop(self):
+        """Фоновый поток: объединенный fsync журнала и его сворачивание."""
+        while not self._closing:
+            self._dirty.wait()
+            if self._closing:
+                break
+            
+            # Даем накопиться соседним изменениям, чтобы сделать один fsync
+            time.sleep(WRITE_COALESCE_DELAY)
+            self._dirty.clear()
+            self._flush_journal()
+    
+    def _flush_journal(self):
+        """Сброс журнала на диск и сворачивание при превышении размера."""
+        try:
+            os.fsync(self._journal.fileno())
+            
+            if self._journal.tell() > JOURNAL_COMPACT_SIZE:
+                self._compact()
+        except Exception as e:
+            logger.error(f"Ошибка записи журнала: {e}")
+    
+    def _replay_journal(self, start: int = 0):
+        """
+        Применение к загруженным данным операций из журнала.
+        
+        Args:
+            start: Смещение в журнале, с которого читать операции
+        """
+        if not os.path.exists(self._journal_path):
+            return
+        
+        appointments = self.data.setdefault("appointments", [])
+        patients = self.data.setdefault("patients", [])
+        appointments_by_id = {apt.get("id"): apt for apt in appointments}
+        patient_ids = {patient.get("id") for patient in patients}
+        replayed = 0
+        
+        with open(self._journal_path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                try:
+                    record = orjson.loads(line)
+                except ValueError:
+                    # Недописанная строка после сбоя
+                    logger.warning("Пропущена поврежденная запись журнала")
+                    continue
+                
+                op = record.get("op")
+                payload = record.get("data", {})
+                
+                # Операции идемпотентны: журнал мог пережить уже сохраненный снимок
+                if op == "add_appointment":
+                    if payload.get("id") not in appointments_by_id:
+                        appointments.append(payload)
+                        appointments_by_id[payload.get("id")] = payload
+                elif op == "cancel_appointment":
+                    appointment = appointments_by_id.get(payload.get("id"))
+                    if appointment:
+                        appointment["status"] = "cancelled"
+                        appointment["cancelled_at"] = payload.get("cancelled_at")
+                elif op == "add_patient":
+                    if payload.get("id") not in patient_ids:
+                        patients.append(payload)
+                        patient_ids.add(payload.get("id"))
+                replayed += 1
+            
+            if replayed:
+                self._dirty_sections.update(("appointments", "patients"))
+            
+            self._journal_pos = f.tell()
+        
+        if replayed:
+            logger.info(f"Из журнала применено операций: {replayed}")
+    
+    def _compact(self):
+        """Сохранение полного снимка базы и очистка журнала."""
+        with self._file_lock():
+            # Снимок должен включать и изменения других процессов
+            self._refresh()
+            if self._save_data():
+                self._journal.truncate(0)
+                self._journal_pos = 0
+                logger.debug("Журнал изменений свернут в базу")
     
     def _ensure_sample_data(self):
         """Создание примеров данных, если база пуста."""
-        if not self.data.get("services"):
-            self._create_sample_services()
+        with self._file_lock():
+            # Базу мог уже заполнить другой процесс
+            self._refresh()
+            created = False
+            
+            if not self.data.get("services"):
+                self._create_sample_services()
+                created = True
+            
+            if not self.data.get("doctors"):
+                self._create_sample_doctors()
+                created = True
+            
+            if not self.data.get("schedule"):
+                self._create_sample_schedule()
+                created = True
+            
+            # Снимок перезаписываем, только если что-то добавили
+            if created:
+                self._compact()
+            self._rebuild_indexes()
+    
+    def _rebuild_indexes(self):
+        """Построение индексов по текущим данным."""
+        self._bind_sections()
+        self._intern_fields()
+        
+        self._services_by_id = {s.get("id"): s for s in self.services}
+        self._doctors_by_id = {d.get("id"): d for d in self.doctors}
+        self._specialty_counts = Counter(d.get("specialty", "unknown") for d in self.doctors)
+        
+        # Рабочие часы в минутах от начала суток: (врач, день недели) -> (начало, конец)
+        self._schedule_minutes = {}
+        for doctor_id, days in self.schedule.items():
+            for weekday, hours in days.items():
+                if hours.get("start") and hours.get("end"):
+                    self._schedule_minutes[(doctor_id, weekday)] = (
+                        _hhmm_to_min(hours["start"]),
+                        _hhmm_to_min(hours["end"])
+                    )
+        
+        self._patients_by_phone = {}
+        for patient in self.patients:
+            self._index_patient(patient)
         
-        if not self.data.get("doctors"):
-            self._create_sample_doctors()
+        # Счетчики ID только растут, поэтому номера не повторяются после отмен
+        self._next_appt_id = _next_id(self.appointments)
+        self._next_patient_id = _next_id(self.patients)
         
-        if not self.data.get("schedule"):
-            self._create_sample_schedule()
+        self._appointments_by_id = {}
+        self._appt_index = defaultdict(set)
+        self._appts_by_date = {}
+        self._status_counts = Counter()
+        self._appts_np = None
+        for appointment in self.appointments:
+            self._index_appointment(appointment)
         
-        self._save_data()
+        self._build_search_fields()
     
-    def _create_sample_services(self):
-        """Создание примеров услуг."""
-        sample_services = [
-            {
-                "id": "therapy_consult",
-                "name": "Консультация терапевта",
-                "category": "therapy",
-                "price": 2500,
-                "duration": 30,
-                "description": "Первичная консультация врача-терапевта",
-                "preparation": "Особой подготовки не требуется"
-            },
-            {
-                "id": "therapy_repeat",
-                "name": "Повторная консультация терапевта",
-                "category": "therapy",
-                "price": 2000,
-                "duration": 20,
-                "description": "Повторный прием врача-терапевта"
-            },
-            {
-                "id": "cardio_consult",
-                "name": "Консультация кардиолога",
-                "category": "cardiology",
-                "price": 3000,
-                "duration": 40,
-                "description": "Консультация врача-кардиолога"
-            },
-            {
-                "id": "neuro_consult",
-                "name": "Консультация невролога",
-                "category": "neurology",
-                "price": 2800,
-                "duration": 35,
-                "description": "Консультация врача-невролога"
-            },
-            {
-                "id": "gyneco_consult",
-                "name": "Консультация гинеколога",
-                "category": "gynecology",
-                "price": 2500,
-                "duration": 30,
-                "description": "Консультация врача-гинеколога"
-            },
-            {
-                "id": "urology_consult",
-                "name": "Консультация уролога",
-                "category": "urology",
-                "price": 2700,
-                "duration": 30,
-                "description": "Консультация врача-уролога"
-            },
-            {
-                "id": "pediatric_consult",
-                "name": "Консультация педиатра",
-                "category": "pediatrics",
-                "price": 2200,
-                "duration": 30,
-                "description": "Консультация врача-педиатра"
-            },
-            {
-                "id": "ecg",
-                "name": "ЭКГ с расшифровкой",
-                "category": "diagnostics",
-                "price": 800,
-                "duration": 15,
-                "description": "Электрокардиография с расшифровкой"
-            },
-            {
-                "id": "echo_heart",
-                "name": "УЗИ сердца (ЭхоКГ)",
-                "category": "diagnostics",
-                "price": 2800,
-                "duration": 30,
-                "description": "Ультразвуковое исследование сердца"
-            },
-            {
-                "id": "blood_general",
-                "name": "Общий анализ крови",
-                "category": "laboratory",
-                "price": 500,
-                "duration": 10,
-                "description": "Общий клинический анализ крови",
-                "preparation": "Сдается натощак утром"
-            },
-            {
-                "id": "blood_biochem",
-                "name": "Биохимический анализ крови",
-                "category": "laboratory",
-                "price": 1200,
-                "duration": 10,
-                "description": "Биохимическое исследование крови",
-                "preparation": "12-часовое голодание перед сдачей"
-            },
-            {
-                "id": "urine_general",
-                "name": "Общий анализ мочи",
-                "category": "laboratory",
-                "price": 400,
-                "duration": 5,
-                "description": "Общий клинический анализ мочи",
-                "preparation": "Утренняя порция мочи, средний поток"
+    def _bind_sections(self):
+        """Привязка разделов self.data к атрибутам (списки общие по ссылке)."""
+        self.services = self.data.setdefault("services", [])
+        self.doctors = self.data.setdefault("doctors", [])
+        self.schedule = self.data.setdefault("schedule", {})
+        self.appointments = self.data.setdefault("appointments", [])
+        self.patients = self.data.setdefault("patients", [])
+    
+    def _intern_fields(self):
+        """
+        Интернирование часто повторяющихся строк загруженных данных.
+        
+        Специальности, категории, статусы и дни недели после разбора JSON -
+        отдельные объекты в каждой записи; общие экземпляры экономят память
+        и ускоряют сравнение и поиск по словарям.
+        """
+        for doctor in self.doctors:
+            if isinstance(doctor.get("specialty"), str):
+                doctor["specialty"] = sys.intern(doctor["specialty"])
+        
+        for service in self.services:
+            if isinstance(service.get("category"), str):
+                service["category"] = sys.intern(service["category"])
+        
+        for appointment in self.appointments:
+            if isinstance(appointment.get("status"), str):
+                appointment["status"] = sys.intern(appointment["status"])
+        
+        for doctor_id, days in self.schedule.items():
+            self.schedule[doctor_id] = {sys.intern(weekday): hours for weekday, hours in days.items()}
+    
+    def _build_search_fields(self):
+        """Подготовка поисковых каталогов услуг и врачей (в нижнем регистре)."""
+        self._services_buf, self._services_offsets = build_catalog([
+            "\x00".join((
+                service.get("name", ""),
+                service.get("category", ""),
+                service.get("description", "")
+            )).lower()
+            for service in self.services
+        ])
+        self._doctors_buf, self._doctors_offsets = build_catalog([
+            "\x00".join((
+                doctor.get("name", ""),
+                doctor.get("specialty", ""),
+                doctor.get("position", "")
+            )).lower()
+            for doctor in self.doctors
+        ])
+    
+    def _index_patient(self, patient: Dict[str, Any]):
+        """Добавление пациента в индекс по нормализованному телефону."""
+        phone = _norm_phone(patient.get("phone"))
+        if phone:
+            self._patients_by_phone.setdefault(phone, patient)
+    
+    def _index_appointment(self, appointment: Dict[str, Any]):
+        """Добавление записи на прием в индексы."""
+        self._appointments_by_id[appointment.get("id")] = appointment
+        self._status_counts[appointment.get("status")] += 1
+        if appointment.get("status") != "cancelled":
+            key = (appointment.get("doctor_id"), appointment.get("date"))
+            self._appt_index[key].add(appointment.get("time"))
+            self._appts_by_date.setdefault(appointment.get("date"), []).append(appointment)
+            self._appts_np = None
+    
+    def _get_appointment_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Активные записи в виде параллельных массивов numpy.
+        
+        Пересобираются лениво после изменения записей.
+        """
+        if self._appts_np is None:
+            doctor_pos = {doctor.get("id"): i for i, doctor in enumerate(self.doctors)}
+            doctor_idx, date_ord, time_min = [], [], []
+            
+            for (doctor_id, date), times in self._appt_index.items():
+                if doctor_id not in doctor_pos or not times:
+                    continue
+                try:
+                    ordinal = _parse_date(date).toordinal()
+                except (AttributeError, ValueError):
+                    continue
+                for time_str in times:
+                    try:
+                        minutes = _hhmm_to_min(time_str)
+                    except (AttributeError, ValueError):
+                        continue
+                    doctor_idx.append(doctor_pos[doctor_id])
+                    date_ord.append(ordinal)
+                    time_min.append(minutes)
+            
+            self._appts_np = {
+                "doctor_idx": np.array(doctor_idx, dtype=np.int64),
+                "date_ord": np.array(date_ord, dtype=np.int64),
+                "time_min": np.array(time_min, dtype=np.int64)
             }
-        ]
         
-        self.data["services"] = sample_services
+        return self._appts_np
+    
+    def _create_sample_services(self):
+        """Создание примеров услуг."""
+        self.data["services"] = [dict(service) for service in _SAMPLE_SERVICES]
+        self._dirty_sections.add("services")
         logger.info("Созданы примеры услуг")
     
     def _create_sample_doctors(self):
         """Создание примеров врачей."""
-        sample_doctors = [
-            {
-                "id": "ivanova_ap",
-                "name": "Иванова Анна Петровна",
-                "specialty": "therapy",
-                "position": "Врач-терапевт",
-                "experience": 15,
-                "education": "ТГМИ, 2009",
-                "room": "101"
-            },
-            {
-                "id": "petrov_sm",
-                "name": "Петров Сергей Михайлович",
-                "specialty": "therapy",
-                "position": "Врач-терапевт высшей категории",
-                "experience": 20,
-                "education": "ТГМИ, 2004",
-                "room": "102"
-            },
-            {
-                "id": "sidorova_ev",
-                "name": "Сидорова Елена Владимировна",
-                "specialty": "cardiology",
-                "position": "Врач-кардиолог",
-                "experience": 12,
-                "education": "ТГМИ, 2012",
-                "room": "201"
-            },
-            {
-                "id": "mikhailov_ik",
-                "name": "Михайлов Игорь Константинович",
-                "specialty": "cardiology",
-                "position": "Врач-кардиолог высшей категории",
-                "experience": 25,
-                "education": "ТГМИ, 1999",
-                "room": "202"
-            },
-            {
-                "id": "kozlova_ma",
-                "name": "Козлова Мария Александровна",
-                "specialty": "neurology",
-                "position": "Врач-невролог",
-                "experience": 10,
-                "education": "ТГМИ, 2014",
-                "room": "301"
-            },
-            {
-                "id": "fedorov_ds",
-                "name": "Федоров Дмитрий Сергеевич",
-                "specialty": "neurology",
-                "position": "Врач-невролог",
-                "experience": 8,
-                "education": "ТГМИ, 2016",
-                "room": "302"
-            },
-            {
-                "id": "romanova_li",
-                "name": "Романова Людмила Ивановна",
-                "specialty": "gynecology",
-                "position": "Врач-гинеколог",
-                "experience": 18,
-                "education": "ТГМИ, 2006",
-                "room": "401"
-            },
-            {
-                "id": "nikolaeva_op",
-                "name": "Николаева Ольга Павловна",
-                "specialty": "gynecology",
-                "position": "Врач-гинеколог высшей категории",
-                "experience": 22,
-                "education": "ТГМИ, 2002",
-                "room": "402"
-            }
-        ]
-        
-        self.data["doctors"] = sample_doctors
+        self.data["doctors"] = [dict(doctor) for doctor in _SAMPLE_DOCTORS]
+        self._dirty_sections.add("doctors")
         logger.info("Созданы примеры врачей")
     
     def _create_sample_schedule(self):
         """Создание примера расписания."""
-        schedule = {
-            "ivanova_ap": {
-                "monday": {"start": "09:00", "end": "15:00"},
-                "wednesday": {"start": "09:00", "end": "15:00"},
-                "friday": {"start": "09:00", "end": "15:00"}
-            },
-            "petrov_sm": {
-                "tuesday": {"start": "10:00", "end": "16:00"},
-                "thursday": {"start": "10:00", "end": "16:00"},
-                "saturday": {"start": "09:00", "end": "13:00"}
-            },
-            "sidorova_ev": {
-                "monday": {"start": "14:00", "end": "19:00"},
-                "wednesday": {"start": "14:00", "end": "19:00"}
-            },
-            "mikhailov_ik": {
-                "tuesday": {"start": "09:00", "end": "14:00"},
-                "thursday": {"start": "09:00", "end": "14:00"},
-                "friday": {"start": "09:00", "end": "14:00"}
-            },
-            "kozlova_ma": {
-                "monday": {"start": "10:00", "end": "16:00"},
-                "tuesday": {"start": "10:00", "end": "16:00"},
-                "thursday": {"start": "10:00", "end": "16:00"}
-            },
-            "fedorov_ds": {
-                "wednesday": {"start": "14:00", "end": "20:00"},
-                "friday": {"start": "14:00", "end": "20:00"}
-            },
-            "romanova_li": {
-                "tuesday": {"start": "09:00", "end": "15:00"},
-                "thursday": {"start": "09:00", "end": "15:00"},
-                "saturday": {"start": "09:00", "end": "15:00"}
-            },
-            "nikolaeva_op": {
-                "monday": {"start": "13:00", "end": "19:00"},
-                "wednesday": {"start": "13:00", "end": "19:00"},
-                "friday": {"start": "13:00", "end": "19:00"}
-            }
-        }
-        
-        self.data["schedule"] = schedule
+        self.data["schedule"] = copy.deepcopy(_SAMPLE_SCHEDULE)
+        self._dirty_sections.add("schedule")
         logger.info("Создано примерное расписание")
     
     def get_services_info(self, query: str = None) -> List[Dict[str, Any]]:
@@ -326,22 +837,16 @@ class MedicalDBService:
             Список услуг
         """
         try:
-            services = self.data.get("services", [])
+            services = self.services
             
             if not query:
                 return services
             
-            # Простой поиск по запросу
-            query_lower = query.lower()
-            filtered_services = []
+            # Поиск подстроки по каталогу услуг
+            found = find_records(self._services_buf, self._services_offsets,
+                                 query.lower().encode("utf-8"))
             
-            for service in services:
-                if (query_lower in service.get("name", "").lower() or
-                    query_lower in service.get("category", "").lower() or
-                    query_lower in service.get("description", "").lower()):
-                    filtered_services.append(service)
-            
-            return filtered_services
+            return [services[i] for i in found]
             
         except Exception as e:
             logger.error(f"Ошибка получения услуг: {e}")
@@ -358,7 +863,7 @@ class MedicalDBService:
             Список врачей
         """
         try:
-            doctors = self.data.get("doctors", [])
+            doctors = self.doctors
             
             specialty_doctors = [
                 doctor for doctor in doctors 
@@ -383,25 +888,11 @@ class MedicalDBService:
             Расписание врача
         """
         try:
-            schedule = self.data.get("schedule", {})
-            doctor_schedule = schedule.get(doctor_id, {})
+            doctor_schedule = self.schedule.get(doctor_id, {})
             
             if date:
                 # Определяем день недели
-                date_obj = datetime.strptime(date, "%Y-%m-%d")
-                weekday = date_obj.strftime("%A").lower()
-                
-                weekday_map = {
-                    "monday": "monday",
-                    "tuesday": "tuesday", 
-                    "wednesday": "wednesday",
-                    "thursday": "thursday",
-                    "friday": "friday",
-                    "saturday": "saturday",
-                    "sunday": "sunday"
-                }
-                
-                day_schedule = doctor_schedule.get(weekday_map.get(weekday), {})
+                day_schedule = doctor_schedule.get(_weekday_of(date), {})
                 return {"date": date, "schedule": day_schedule}
             
             return {"doctor_id": doctor_id, "schedule": doctor_schedule}
@@ -423,36 +914,22 @@ class MedicalDBService:
             True если время доступно
         """
         try:
+            self._sync()
+            
             # Проверяем расписание врача
-            schedule_info = self.get_doctor_schedule(doctor_id, date)
-            day_schedule = schedule_info.get("schedule", {})
+            hours = self._schedule_minutes.get((doctor_id, _weekday_of(date)))
             
-            if not day_schedule:
+            if not hours:
                 return False  # Врач не работает в этот день
             
             # Проверяем, что время входит в рабочие часы
-            start_time = day_schedule.get("start")
-            end_time = day_schedule.get("end")
-            
-            if not start_time or not end_time:
-                return False
-            
-            time_obj = datetime.strptime(time, "%H:%M").time()
-            start_obj = datetime.strptime(start_time, "%H:%M").time()
-            end_obj = datetime.strptime(end_time, "%H:%M").time()
-            
-            if not (start_obj <= time_obj <= end_obj):
+            start_min, end_min = hours
+            if not (start_min <= _hhmm_to_min(time) <= end_min):
                 return False
             
             # Проверяем, что время не занято
-            appointments = self.data.get("appointments", [])
-            
-            for appointment in appointments:
-                if (appointment.get("doctor_id") == doctor_id and
-                    appointment.get("date") == date and
-                    appointment.get("time") == time and
-                    appointment.get("status") != "cancelled"):
-                    return False
+            if time in self._appt_index.get((doctor_id, date), ()):
+                return False
             
             return True
             
@@ -470,102 +947,156 @@ class MedicalDBService:
         Returns:
             Результат создания записи
         """
-        try:
-            # Генерируем ID записи
-            appointment_id = f"apt_{len(self.data.get('appointments', []))+ 1:06d}"
-            
-            # Проверяем доступность
-            is_available = self.check_appointment_availability(
-                appointment_data.get("doctor_id"),
-                appointment_data.get("date"),
-                appointment_data.get("time")
-            )
-            
-            if not is_available:
+        with self._file_lock():
+            try:
+                self._refresh()
+                
+                # Генерируем ID записи
+                appointment_id = f"apt_{self._next_appt_id:06d}"
+                
+                # Проверяем доступность
+                is_available = self.check_appointment_availability(
+                    appointment_data.get("doctor_id"),
+                    appointment_data.get("date"),
+                    appointment_data.get("time")
+                )
+                
+                if not is_available:
+                    return {
+                        "success": False,
+                        "message": "Выбранное время недоступно"
+                    }
+                
+                # Создаем запись
+                self._next_appt_id += 1
+                appointment = {
+                    "id": appointment_id,
+                    "doctor_id": appointment_data.get("doctor_id"),
+                    "patient_name": appointment_data.get("patient_name"),
+                    "patient_phone": appointment_data.get("patient_phone"),
+                    "date": appointment_data.get("date"),
+                    "time": appointment_data.get("time"),
+                    "service_id": appointment_data.get("service_id"),
+                    "complaint": appointment_data.get("complaint", ""),
+                    "status": "scheduled",
+                    "created_at": datetime.now().isoformat()
+                }
+                
+                # Добавляем в базу
+                self.appointments.append(appointment)
+                self._index_appointment(appointment)
+                self._dirty_sections.add("appointments")
+                self._append_journal("add_appointment", appointment)
+                
+                return {
+                    "success": True,
+                    "appointment_id": appointment_id,
+                    "message": f"Запись создана на {appointment_data.get('date')} в {appointment_data.get('time')}"
+                }
+                
+            except Exception as e:
+                logger.error(f"Ошибка создания записи: {e}")
                 return {
                     "success": False,
-                    "message": "Выбранное время недоступно"
+                    "message": "Ошибка при создании записи"
                 }
+        
+    def get_available_times(self, doctor_id: str, date: str) -> List[str]:
+        """
+        Получение доступного времени для записи.
+        
+        Args:
+            doctor_id: ID врача
+            date: Дата
             
-            # Создаем запись
-            appointment = {
-                "id": appointment_id,
-                "doctor_id": appointment_data.get("doctor_id"),
-                "patient_name": appointment_data.get("patient_name"),
-                "patient_phone": appointment_data.get("patient_phone"),
-                "date": appointment_data.get("date"),
-                "time": appointment_data.get("time"),
-                "service_id": appointment_data.get("service_id"),
-                "complaint": appointment_data.get("complaint", ""),
-                "status": "scheduled",
-                "created_at": datetime.now().isoformat()
-            }
+        Returns:
+            Список доступного времени
+        """
+        try:
+            self._sync()
             
-            # Добавляем в базу
-            if "appointments" not in self.data:
-                self.data["appointments"] = []
+            # Получаем рабочие часы врача
+            hours = self._schedule_minutes.get((doctor_id, _weekday_of(date)))
             
-            self.data["appointments"].append(appointment)
-            self._save_data()
+            if not hours:
+                return []
             
-            return {
-                "success": True,
-                "appointment_id": appointment_id,
-                "message": f"Запись создана на {appointment_data.get('date')} в {appointment_data.get('time')}"
-            }
+            # Генерируем временные слоты (каждые 30 минут) и исключаем занятые
+            start_min, end_min = hours
+            taken = self._appt_index.get((doctor_id, date), ())
+            slots = (_min_to_hhmm(minute) for minute in range(start_min, end_min, SLOT_MINUTES))
+            
+            return [time_str for time_str in slots if time_str not in taken]
             
         except Exception as e:
-            logger.error(f"Ошибка создания записи: {e}")
-            return {
-                "success": False,
-                "message": "Ошибка при создании записи"
-            }
+            logger.error(f"Ошибка получения доступного времени: {e}")
+            return []
     
-    def get_available_times(self, doctor_id: str, date: str) -> List[str]:
+    def get_week_availability(self, specialty: str, start_date: str,
+                              days: int = 7) -> List[Dict[str, Any]]:
         """
-        Получение доступного времени для записи.
+        Получение свободного времени всех врачей специальности за период.
         
         Args:
-            doctor_id: ID врача
-            date: Дата
+            specialty: Специальность врача
+            start_date: Первая дата периода в формате YYYY-MM-DD
+            days: Количество дней
             
         Returns:
-            Список доступного времени
+            Список {"doctor_id", "date", "times"} для дней, где есть свободное время
         """
         try:
-            # Получаем расписание врача
-            schedule_info = self.get_doctor_schedule(doctor_id, date)
-            day_schedule = schedule_info.get("schedule", {})
+            self._sync()
+            
+            start = _parse_date(start_date)
+            dates = [start + timedelta(days=d) for d in range(days)]
             
-            if not day_schedule:
+            rows = [
+                (i, doctor.get("id")) for i, doctor in enumerate(self.doctors)
+                if doctor.get("specialty") == specialty
+            ]
+            if not rows or days <= 0:
                 return []
             
-            start_time = day_schedule.get("start")
-            end_time = day_schedule.get("end")
+            doc_row = np.full(len(self.doctors), -1, dtype=np.int64)
+            day_start = np.full((len(rows), days), -1, dtype=np.int64)
+            day_end = np.full((len(rows), days), -1, dtype=np.int64)
             
-            if not start_time or not end_time:
-                return []
+            for r, (doctor_pos, doctor_id) in enumerate(rows):
+                doc_row[doctor_pos] = r
+                for d, day in enumerate(dates):
+                    hours = self._schedule_minutes.get((doctor_id, _WEEKDAYS[day.weekday()]))
+                    if hours:
+                        day_start[r, d], day_end[r, d] = hours
             
-            # Генерируем временные слоты (каждые 30 минут)
-            start_obj = datetime.strptime(start_time, "%H:%M")
-            end_obj = datetime.strptime(end_time, "%H:%M")
+            worked = day_start >= 0
+            if not worked.any():
+                return []
+            n_slots = int(((day_end - day_start)[worked] + SLOT_MINUTES - 1).max() // SLOT_MINUTES)
             
-            available_times = []
-            current_time = start_obj
+            out = np.empty((len(rows), days, max(n_slots, 0)), dtype=np.bool_)
+            appts = self._get_appointment_arrays()
+            compute_availability(
+                appts["doctor_idx"], appts["date_ord"], appts["time_min"],
+                doc_row, start.toordinal(), day_start, day_end, SLOT_MINUTES, out
+            )
             
-            while current_time < end_obj:
-                time_str = current_time.strftime("%H:%M")
-                
-                # Проверяем доступность
-                if self.check_appointment_availability(doctor_id, date, time_str):
-                    available_times.append(time_str)
-                
-                current_time += timedelta(minutes=30)
+            result = []
+            for r, (_, doctor_id) in enumerate(rows):
+                for d, day in enumerate(dates):
+                    free = np.flatnonzero(out[r, d])
+                    if free.size:
+                        start_min = int(day_start[r, d])
+                        result.append({
+                            "doctor_id": doctor_id,
+                            "date": day.strftime("%Y-%m-%d"),
+                            "times": [_min_to_hhmm(start_min + SLOT_MINUTES * int(s)) for s in free]
+                        })
             
-            return available_times
+            return result
             
         except Exception as e:
-            logger.error(f"Ошибка получения доступного времени: {e}")
+            logger.error(f"Ошибка получения доступности на неделю: {e}")
             return []
     
     def search_doctors(self, query: str) -> List[Dict[str, Any]]:
@@ -579,18 +1110,11 @@ class MedicalDBService:
             Список врачей
         """
         try:
-            doctors = self.data.get("doctors", [])
-            query_lower = query.lower()
-            
-            filtered_doctors = []
+            doctors = self.doctors
+            found = find_records(self._doctors_buf, self._doctors_offsets,
+                                 query.lower().encode("utf-8"))
             
-            for doctor in doctors:
-                if (query_lower in doctor.get("name", "").lower() or
-                    query_lower in doctor.get("specialty", "").lower() or
-                    query_lower in doctor.get("position", "").lower()):
-                    filtered_doctors.append(doctor)
-            
-            return filtered_doctors
+            return [doctors[i] for i in found]
             
         except Exception as e:
             logger.error(f"Ошибка поиска врачей: {e}")
@@ -607,13 +1131,7 @@ class MedicalDBService:
             Информация об услуге
         """
         try:
-            services = self.data.get("services", [])
-            
-            for service in services:
-                if service.get("id") == service_id:
-                    return service
-            
-            return None
+            return self._services_by_id.get(service_id)
             
         except Exception as e:
             logger.error(f"Ошибка получения услуги: {e}")
@@ -630,13 +1148,7 @@ class MedicalDBService:
             Информация о враче
         """
         try:
-            doctors = self.data.get("doctors", [])
-            
-            for doctor in doctors:
-                if doctor.get("id") == doctor_id:
-                    return doctor
-            
-            return None
+            return self._doctors_by_id.get(doctor_id)
             
         except Exception as e:
             logger.error(f"Ошибка получения врача: {e}")
@@ -653,14 +1165,9 @@ class MedicalDBService:
             Список записей
         """
         try:
-            appointments = self.data.get("appointments", [])
-            
-            date_appointments = [
-                apt for apt in appointments 
-                if apt.get("date") == date and apt.get("status") != "cancelled"
-            ]
+            self._sync()
             
-            return date_appointments
+            return list(self._appts_by_date.get(date, ()))
             
         except Exception as e:
             logger.error(f"Ошибка получения записей: {e}")
@@ -676,33 +1183,47 @@ class MedicalDBService:
         Returns:
             Результат отмены
         """
-        try:
-            appointments = self.data.get("appointments", [])
-            
-            for appointment in appointments:
-                if appointment.get("id") == appointment_id:
-                    appointment["status"] = "cancelled"
-                    appointment["cancelled_at"] = datetime.now().isoformat()
-                    
-                    self._save_data()
-                    
+        with self._file_lock():
+            try:
+                self._refresh()
+                
+                appointment = self._appointments_by_id.get(appointment_id)
+                
+                if not appointment:
                     return {
-                        "success": True,
-                        "message": "Запись успешно отменена"
+                        "success": False,
+                        "message": "Запись не найдена"
                     }
-            
-            return {
-                "success": False,
-                "message": "Запись не найдена"
-            }
-            
-        except Exception as e:
-            logger.error(f"Ошибка отмены записи: {e}")
-            return {
-                "success": False,
-                "message": "Ошибка при отмене записи"
-            }
-    
+                
+                if appointment.get("status") != "cancelled":
+                    key = (appointment.get("doctor_id"), appointment.get("date"))
+                    self._appt_index[key].discard(appointment.get("time"))
+                    self._appts_by_date[appointment.get("date")].remove(appointment)
+                    self._status_counts[appointment.get("status")] -= 1
+                    self._status_counts["cancelled"] += 1
+                    self._appts_np = None
+                
+                appointment["status"] = "cancelled"
+                appointment["cancelled_at"] = datetime.now().isoformat()
+                self._dirty_sections.add("appointments")
+                
+                self._append_journal("cancel_appointment", {
+                    "id": appointment_id,
+                    "cancelled_at": appointment["cancelled_at"]
+                })
+                
+                return {
+                    "success": True,
+                    "message": "Запись успешно отменена"
+                }
+                
+            except Exception as e:
+                logger.error(f"Ошибка отмены записи: {e}")
+                return {
+                    "success": False,
+                    "message": "Ошибка при отмене записи"
+                }
+        
     def get_statistics(self) -> Dict[str, Any]:
         """
         Получение статистики медицинского центра.
@@ -711,34 +1232,17 @@ class MedicalDBService:
             Статистическая информация
         """
         try:
-            stats = {
-                "total_services": len(self.data.get("services", [])),
-                "total_doctors": len(self.data.get("doctors", [])),
-                "total_appointments": len(self.data.get("appointments", [])),
-                "active_appointments": len([
-                    apt for apt in self.data.get("appointments", [])
-                    if apt.get("status") == "scheduled"
-                ]),
-                "cancelled_appointments": len([
-                    apt for apt in self.data.get("appointments", [])
-                    if apt.get("status") == "cancelled"
-                ])
-            }
-            
-            # Статистика по специальностям
-            doctors = self.data.get("doctors", [])
-            specialties = {}
-            
-            for doctor in doctors:
-                specialty = doctor.get("specialty", "unknown")
-                if specialty in specialties:
-                    specialties[specialty] += 1
-                else:
-                    specialties[specialty] = 1
+            self._sync()
             
-            stats["doctors_by_specialty"] = specialties
-            
-            return stats
+            # Счетчики поддерживаются при изменении данных
+            return {
+                "total_services": len(self.services),
+                "total_doctors": len(self.doctors),
+                "total_appointments": len(self.appointments),
+                "active_appointments": self._status_counts["scheduled"],
+                "cancelled_appointments": self._status_counts["cancelled"],
+                "doctors_by_specialty": dict(self._specialty_counts)
+            }
             
         except Exception as e:
             logger.error(f"Ошибка получения статистики: {e}")
@@ -754,33 +1258,36 @@ class MedicalDBService:
         Returns:
             ID пациента
         """
-        try:
-            # Генерируем ID пациента
-            patient_id = f"pat_{len(self.data.get('patients', [])) + 1:06d}"
-            
-            patient = {
-                "id": patient_id,
-                "name": patient_data.get("name"),
-                "phone": patient_data.get("phone"),
-                "email": patient_data.get("email", ""),
-                "birth_date": patient_data.get("birth_date", ""),
-                "created_at": datetime.now().isoformat()
-            }
-            
-            if "patients" not in self.data:
-                self.data["patients"] = []
-            
-            self.data["patients"].append(patient)
-            self._save_data()
-            
-            logger.info(f"Добавлен пациент {patient_id}")
-            
-            return patient_id
-            
-        except Exception as e:
-            logger.error(f"Ошибка добавления пациента: {e}")
-            return ""
-    
+        with self._file_lock():
+            try:
+                self._refresh()
+                
+                # Генерируем ID пациента
+                patient_id = f"pat_{self._next_patient_id:06d}"
+                self._next_patient_id += 1
+                
+                patient = {
+                    "id": patient_id,
+                    "name": patient_data.get("name"),
+                    "phone": patient_data.get("phone"),
+                    "email": patient_data.get("email", ""),
+                    "birth_date": patient_data.get("birth_date", ""),
+                    "created_at": datetime.now().isoformat()
+                }
+                
+                self.patients.append(patient)
+                self._index_patient(patient)
+                self._dirty_sections.add("patients")
+                self._append_journal("add_patient", patient)
+                
+                logger.info(f"Добавлен пациент {patient_id}")
+                
+                return patient_id
+                
+            except Exception as e:
+                logger.error(f"Ошибка добавления пациента: {e}")
+                return ""
+        
     def find_patient_by_phone(self, phone: str) -> Optional[Dict[str, Any]]:
         """
         Поиск пациента по номеру телефона.
@@ -792,13 +1299,13 @@ class MedicalDBService:
             Данные пациента или None
         """
         try:
-            patients = self.data.get("patients", [])
+            self._sync()
             
-            for patient in patients:
-                if patient.get("phone") == phone:
-                    return patient
+            normalized = _norm_phone(phone)
+            if not normalized:
+                return None
             
-            return None
+            return self._patients_by_phone.get(normalized)
             
         except Exception as e:
             logger.error(f"Ошибка поиска пациента: {e}")
@@ -807,7 +1314,14 @@ class MedicalDBService:
     def close(self):
         """Закрытие сервиса и сохранение данных."""
         try:
-            self._save_data()
+            self._closing = True
+            self._dirty.set()
+            self._writer_thread.join()
+            
+            with self._lock:
+                self._compact()
+                self._journal.close()
+                os.close(self._lock_fd)
             logger.info("Медицинская база данных закрыта")
         except Exception as e:
             logger.error(f"Ошибка закрытия базы данных: {e}")
\ No newline at end of file
@@ -2,19 +2,176 @@
 RAG (Retrieval-Augmented Generation) сервис для медицинской базы знаний.
 """
 import os
+import gc
+import mmap
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional, Dict, Any
+import sqlite3
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from pathlib import Path
+from uuid import uuid4
 
-from langchain.document_loaders import TextLoader, PyPDFLoader, DirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import OpenAIEmbeddings
+import numpy as np
+import chromadb
+from semantic_text_splitter import TextSplitter
+from langchain_openai import OpenAIEmbeddings
+from langchain.document_loaders import TextLoader, PyPDFLoader
 from langchain.vectorstores import Chroma
 from langchain.schema import Document
 from langchain_community.document_loaders import UnstructuredFileLoader
 
+from services._vector_index import HAS_FAISS, MIN_VECTORS as ANN_MIN_VECTORS, IVFPQIndex
+
 logger = logging.getLogger(__name__)
 
+# Коллекция Chroma с медицинской базой знаний
+COLLECTION_NAME = "medical"
+
+# Модель эмбеддингов OpenAI и размерность векторов (усечение через параметр dimensions)
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 512
+
+# Модель и размерность эмбеддингов (ключ кэша эмбеддингов)
+EMBEDDING_TAG = f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}"
+
+# Версия схемы коллекции: модель эмбеддингов и набор метаданных частей
+# (при смене коллекция пересоздается)
+COLLECTION_SCHEMA = f"{EMBEDDING_TAG}:category"
+
+# Категории документов базы знаний (по имени файла)
+DOCUMENT_CATEGORIES = ("services", "doctors", "medical_info", "emergency", "symptoms")
+
+# Размер части документа и перекрытие соседних частей, в токенах модели эмбеддингов.
+# Без перекрытия частей на ~20% меньше, а качество поиска не хуже
+# (рекурсивное разбиение без перекрытия точнее вариантов с перекрытием)
+CHUNK_TOKENS = 1000
+CHUNK_OVERLAP_TOKENS = 0
+
+# Сколько эмбеддингов запросов держать в памяти (частые вопросы о ценах, симптомах)
+QUERY_CACHE_SIZE = 4096
+
+# Максимум параметров в одном запросе SQLite к кэшу эмбеддингов
+CACHE_LOOKUP_BATCH = 500
+
+# Количество частей документов в одном запросе эмбеддингов и одной вставке в Chroma
+EMBED_BATCH_SIZE = 256
+
+# Максимум одновременных запросов эмбеддингов к OpenAI
+EMBED_CONCURRENCY = 8
+
+# Сколько векторов читать из Chroma за один запрос при построении индекса IVF-PQ
+ANN_FETCH_BATCH = 5000
+
+# Расширения файлов, загружаемых в базу знаний
+DOCUMENT_SUFFIXES = frozenset({'.txt', '.pdf', '.md'})
+
+# Сколько загруженных документов копить перед разделением и добавлением в базу
+LOAD_FLUSH_SIZE = 512
+
+# Суммарный размер PDF, начиная с которого разбор выносится в пул процессов
+# (запуск процессов и импорт зависимостей в них окупается только на больших объемах)
+PROCESS_POOL_MIN_PDF_BYTES = 8 * 1024 * 1024
+
+
+def _run_async(coro):
+    """Выполнение корутины из синхронного кода (в том числе внутри работающего цикла)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    
+    # В потоке с работающим циклом asyncio.run недоступен - запускаем в отдельном потоке
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def _iter_files(root: str, suffixes: Optional[frozenset] = None) -> Iterator[str]:
+    """
+    Рекурсивный обход папки через os.scandir (тип файла берется из readdir, без stat).
+    
+    Args:
+        root: Корневая папка
+        suffixes: Допустимые расширения в нижнем регистре (None - все файлы)
+        
+    Yields:
+        Пути к файлам
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(entry.path, suffixes)
+            elif entry.is_file() and (suffixes is None or os.path.splitext(entry.name)[1].lower() in suffixes):
+                yield entry.path
+
+
+def _write_file(path: str, data: bytes):
+    """
+    Запись файла целиком через отображение в память (без буферов io).
+    
+    Args:
+        path: Путь к файлу
+        data: Содержимое файла
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        if not data:
+            return
+        os.ftruncate(fd, len(data))
+        with mmap.mmap(fd, len(data)) as mm:
+            mm[:] = data
+    finally:
+        os.close(fd)
+
+
+def _document_category(stem: str) -> str:
+    """Категория документа по имени файла (например, common_symptoms -> symptoms)."""
+    for category in DOCUMENT_CATEGORIES:
+        if category in stem:
+            return category
+    return stem.split('_')[0]
+
+
+def _load_file(path: str) -> List[Document]:
+    """
+    Загрузка одного файла базы знаний (выполняется в процессе пула).
+    
+    Args:
+        path: Путь к файлу
+        
+    Returns:
+        Документы файла с метаданными или пустой список при ошибке
+    """
+    file_path = Path(path)
+    suffix = file_path.suffix.lower()
+    
+    try:
+        if suffix == '.pdf':
+            loader = PyPDFLoader(path)
+        else:
+            loader = TextLoader(path, encoding='utf-8')
+        
+        docs = loader.load()
+    except Exception as e:
+        logger.warning(f"Не удалось загрузить файл {file_path}: {e}")
+        return []
+    
+    # Добавляем метаданные
+    for doc in docs:
+        doc.metadata.update({
+            'source': path,
+            'filename': file_path.name,
+            'file_type': suffix,
+            'category': _document_category(file_path.stem)
+        })
+    
+    return docs
+
+
 class RAGService:
     """Сервис для работы с медицинской базой знаний через RAG."""
     
@@ -33,6 +190,19 @@ class RAGService:
         self.embeddings = None
         self.vectorstore = None
         self.text_splitter = None
+        self._chroma_client = None
+        self._emb_cache = None
+        
+        # Сжатый индекс IVF-PQ для больших коллекций (см. _ann_search); перестраивается
+        # в фоновом потоке, номер версии растет при каждой вставке в коллекцию
+        self._ann_index = None
+        self._ann_stale = True
+        self._ann_version = 0
+        self._ann_lock = threading.Lock()
+        self._ann_thread = None
+        
+        # Эмбеддинги повторяющихся запросов берем из памяти, без обращения к OpenAI
+        self._embed_query = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._embed_query_uncached)
         
         self._setup_components()
         
@@ -49,17 +219,20 @@ class RAGService:
             # Инициализируем эмбеддинги
             self.embeddings = OpenAIEmbeddings(
                 openai_api_key=self.openai_api_key,
-                model="text-embedding-ada-002"
+                model=EMBEDDING_MODEL,
+                dimensions=EMBEDDING_DIMENSIONS
             )
             
-            # Настраиваем разделитель текста
-            self.text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                length_function=len,
-                separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
+            # Настраиваем разделитель текста (Rust, размер частей в токенах модели)
+            self.text_splitter = TextSplitter.from_tiktoken_model(
+                EMBEDDING_MODEL,
+                CHUNK_TOKENS,
+                overlap=CHUNK_OVERLAP_TOKENS
             )
             
+            # Кэш эмбеддингов переживает пересоздание векторного хранилища
+            self._emb_cache = self._open_embedding_cache()
+            
             # Инициализируем векторное хранилище
             self._setup_vectorstore()
             
@@ -69,26 +242,58 @@ class RAGService:
             logger.error(f"Ошибка настройки RAG компонентов: {e}")
             raise
     
+    def _open_embedding_cache(self) -> sqlite3.Connection:
+        """
+        Открытие дискового кэша эмбеддингов (SHA-256 текста -> вектор float16).
+        
+        Returns:
+            Соединение с базой кэша
+        """
+        cache_dir = os.path.join(self.knowledge_base_path, "chroma_db")
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        # Соединение используется и из потока, в котором выполняется asyncio
+        connection = sqlite3.connect(
+            os.path.join(cache_dir, "emb_cache.sqlite"),
+            check_same_thread=False
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+        connection.commit()
+        return connection
+    
     def _setup_vectorstore(self):
         """Настройка векторного хранилища."""
         try:
             # Путь к базе данных Chroma
             persist_directory = os.path.join(self.knowledge_base_path, "chroma_db")
             
-            # Проверяем, существует ли уже база данных
-            if os.path.exists(persist_directory) and os.listdir(persist_directory):
-                # Загружаем существующую базу
-                self.vectorstore = Chroma(
-                    persist_directory=persist_directory,
-                    embedding_function=self.embeddings
-                )
+            # PersistentClient пишет изменения в SQLite сразу, отдельный persist() не нужен
+            if self._chroma_client is None:
+                self._chroma_client = chromadb.PersistentClient(path=persist_directory)
+            
+            self._ann_index = IVFPQIndex(os.path.join(persist_directory, "ivfpq.faiss"))
+            
+            # Векторы другой модели или части без нужных метаданных несовместимы с запросами.
+            # Схему читаем до открытия коллекции: открытие перезаписывает ее метаданные
+            if self._stored_schema_outdated():
+                logger.info(f"Схема базы знаний изменилась на {COLLECTION_SCHEMA}, база будет пересоздана")
+                self._chroma_client.delete_collection(COLLECTION_NAME)
+                self._ann_index.clear()
+            
+            self.vectorstore = self._open_collection()
+            
+            # Индекс IVF-PQ актуален, только если содержит все векторы коллекции
+            self._ann_index.load()
+            with self._ann_lock:
+                self._ann_version += 1
+                self._ann_stale = self._ann_index.size != self.vectorstore._collection.count()
+            
+            # Проверяем, есть ли уже документы в базе
+            if self.vectorstore._collection.count() > 0:
                 logger.info(f"Загружена существующая база знаний из {persist_directory}")
             else:
-                # Создаем новую базу данных
-                self.vectorstore = Chroma(
-                    persist_directory=persist_directory,
-                    embedding_function=self.embeddings
-                )
                 logger.info(f"Создана новая база знаний в {persist_directory}")
                 
                 # Загружаем документы, если они есть
@@ -98,6 +303,31 @@ class RAGService:
             logger.error(f"Ошибка настройки векторного хранилища: {e}")
             raise
     
+    def _stored_schema_outdated(self) -> bool:
+        """
+        Проверка схемы сохраненной коллекции.
+        
+        Returns:
+            True если коллекция существует, не пуста и построена по другой схеме
+        """
+        try:
+            collection = self._chroma_client.get_collection(COLLECTION_NAME)
+        except Exception:
+            # Коллекции еще нет (ValueError или NotFoundError в зависимости от версии chromadb)
+            return False
+        
+        metadata = collection.metadata or {}
+        return metadata.get("schema") != COLLECTION_SCHEMA and collection.count() > 0
+    
+    def _open_collection(self) -> Chroma:
+        """Открытие (или создание) коллекции базы знаний в Chroma."""
+        return Chroma(
+            client=self._chroma_client,
+            collection_name=COLLECTION_NAME,
+            embedding_function=self.embeddings,
+            collection_metadata={"schema": COLLECTION_SCHEMA}
+        )
+    
     def _load_initial_documents(self):
         """Загрузка начальных документов в базу знаний."""
         try:
@@ -109,35 +339,23 @@ class RAGService:
                 self._create_sample_documents()
                 return
             
-            # Загружаем все документы из папки
-            documents = []
-            
-            for file_path in documents_path.glob("**/*"):
-                if file_path.is_file() and file_path.suffix.lower() in ['.txt', '.pdf', '.md']:
-                    try:
-                        if file_path.suffix.lower() == '.pdf':
-                            loader = PyPDFLoader(str(file_path))
-                        else:
-                            loader = TextLoader(str(file_path), encoding='utf-8')
-                        
-                        docs = loader.load()
-                        
-                        # Добавляем метаданные
-                        for doc in docs:
-                            doc.metadata.update({
-                                'source': str(file_path),
-                                'filename': file_path.name,
-                                'file_type': file_path.suffix.lower()
-                            })
-                        
-                        documents.extend(docs)
-                        
-                    except Exception as e:
-                        logger.warning(f"Не удалось загрузить файл {file_path}: {e}")
-            
-            if documents:
-                self.add_documents(documents)
-                logger.info(f"Загружено {len(documents)} документов в базу знаний")
+            paths = list(_iter_files(str(documents_path), DOCUMENT_SUFFIXES))
+            
+            # Документы добавляем порциями по мере загрузки, не держа в памяти весь корпус
+            buffer = []
+            loaded = 0
+            
+            for docs in self._iter_documents(paths):
+                buffer.extend(docs)
+                loaded += len(docs)
+                if len(buffer) >= LOAD_FLUSH_SIZE:
+                    self._flush_documents(buffer)
+            
+            if buffer:
+                self._flush_documents(buffer)
+            
+            if loaded:
+                logger.info(f"Загружено {loaded} документов в базу знаний")
             else:
                 logger.warning("Документы для загрузки не найдены")
                 self._create_sample_documents()
@@ -145,6 +363,58 @@ class RAGService:
         except Exception as e:
             logger.error(f"Ошибка загрузки начальных документов: {e}")
     
+    def _iter_documents(self, paths: List[str]) -> Iterator[List[Document]]:
+        """
+        Загрузка файлов с выдачей документов по одному файлу.
+        
+        Разбор PDF нагружает CPU, поэтому при большом объеме PDF он
+        распределяется по процессам; файлы отправляются в пул окнами,
+        чтобы не накапливать результаты быстрее, чем они добавляются в базу.
+        Процессы запускаются через spawn: к этому моменту в сервисе уже
+        работают потоки, и fork мог бы скопировать захваченные ими блокировки.
+        
+        Args:
+            paths: Пути к файлам
+            
+        Yields:
+            Документы очередного файла
+        """
+        if len(paths) <= 1 or self._pdf_bytes(paths) < PROCESS_POOL_MIN_PDF_BYTES:
+            for path in paths:
+                yield _load_file(path)
+            return
+        
+        workers = min(os.cpu_count() or 1, len(paths))
+        window = workers * 4
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            for start in range(0, len(paths), window):
+                yield from executor.map(_load_file, paths[start:start + window], chunksize=4)
+    
+    @staticmethod
+    def _pdf_bytes(paths: List[str]) -> int:
+        """Суммарный размер PDF-файлов из списка."""
+        total = 0
+        for path in paths:
+            if path.lower().endswith('.pdf'):
+                try:
+                    total += os.path.getsize(path)
+                except OSError:
+                    continue
+        return total
+    
+    def _flush_documents(self, buffer: List[Document]):
+        """
+        Добавление накопленных документов в базу и очистка буфера.
+        
+        Args:
+            buffer: Буфер документов (очищается)
+        """
+        self.add_documents(buffer)
+        buffer.clear()
+        # Освобождаем объекты страниц PDF до загрузки следующей порции
+        gc.collect()
+    
     def _create_sample_documents(self):
         """Создание примеров медицинских документов."""
         try:
@@ -379,8 +649,7 @@ class RAGService:
             # Создаем файлы
             for doc_info in sample_docs:
                 file_path = Path(self.knowledge_base_path) / doc_info["filename"]
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(doc_info["content"])
+                _write_file(str(file_path), doc_info["content"].encode('utf-8'))
             
             logger.info("Созданы примеры медицинских документов")
             
@@ -402,21 +671,271 @@ class RAGService:
                 logger.warning("Нет документов для добавления")
                 return
             
-            # Разделяем документы на части
-            split_docs = self.text_splitter.split_documents(documents)
-            
-            # Добавляем в векторное хранилище
-            self.vectorstore.add_documents(split_docs)
+            added = _run_async(self._aadd_documents(documents))
             
-            # Сохраняем изменения
-            self.vectorstore.persist()
+            logger.info(f"Добавлено {added} частей документов в базу знаний")
             
-            logger.info(f"Добавлено {len(split_docs)} частей документов в базу знаний")
+            # Индекс IVF-PQ перестраивается в фоне, поиск до этого идет через Chroma
+            self._schedule_ann_rebuild()
             
         except Exception as e:
             logger.error(f"Ошибка добавления документов: {e}")
             raise
     
+    async def _aadd_documents(self, documents: List[Document]) -> int:
+        """
+        Разделение документов, параллельный расчет эмбеддингов и вставка в коллекцию.
+        
+        Args:
+            documents: Список документов для добавления
+            
+        Returns:
+            Количество добавленных частей документов
+        """
+        # Разделяем документы на части
+        split_docs = [
+            Document(page_content=chunk, metadata=dict(doc.metadata))
+            for doc in documents
+            for chunk in self.text_splitter.chunks(doc.page_content)
+        ]
+        
+        texts = [doc.page_content for doc in split_docs]
+        metadatas = [doc.metadata for doc in split_docs]
+        ids = [str(uuid4()) for _ in texts]
+        
+        vectors = await self._aembed_texts(texts)
+        
+        # Вставляем готовые векторы напрямую в коллекцию одной операцией
+        if texts:
+            self._add_to_collection(ids, texts, vectors, metadatas)
+        
+        return len(split_docs)
+    
+    async def _aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Расчет эмбеддингов с использованием дискового кэша.
+        
+        Из OpenAI запрашиваются только уникальные тексты, которых еще нет в кэше.
+        
+        Args:
+            texts: Тексты для эмбеддингов
+            
+        Returns:
+            Эмбеддинги в порядке текстов
+        """
+        if not texts:
+            return []
+        
+        # Повторяющиеся части (шаблонные абзацы) считаем один раз
+        keys = [self._embedding_key(text) for text in texts]
+        _, first, inverse = np.unique(
+            np.array(keys, dtype="S32"), return_index=True, return_inverse=True
+        )
+        unique_keys = [keys[i] for i in first]
+        cached = self._get_cached_embeddings(unique_keys)
+        
+        missing = [i for i in first if keys[i] not in cached]
+        if missing:
+            new_vectors = await self._aembed_uncached([texts[i] for i in missing])
+            self._store_embeddings([keys[i] for i in missing], new_vectors)
+            for i, vector in zip(missing, new_vectors):
+                cached[keys[i]] = vector
+        
+        logger.debug(f"Эмбеддинги: уникальных частей {len(unique_keys)} из {len(texts)}, "
+                     f"новых {len(missing)}")
+        
+        # Векторы приводятся к точности кэша (float16), чтобы не зависеть от попадания в кэш
+        unique_vectors = np.array([cached[key] for key in unique_keys], dtype=np.float16).astype(np.float32)
+        return unique_vectors[inverse.reshape(-1)].tolist()
+    
+    async def _aembed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """
+        Расчет эмбеддингов пачками с ограниченным числом одновременных запросов.
+        
+        Args:
+            texts: Тексты для эмбеддингов
+            
+        Returns:
+            Эмбеддинги в порядке текстов
+        """
+        semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+        
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self.embeddings.aembed_documents(batch)
+        
+        results = await asyncio.gather(
+            *(embed_batch(texts[start:start + EMBED_BATCH_SIZE])
+              for start in range(0, len(texts), EMBED_BATCH_SIZE)),
+            return_exceptions=True
+        )
+        
+        vectors = []
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            vectors.extend(result)
+        
+        return vectors
+    
+    def _embedding_key(self, text: str) -> bytes:
+        """Ключ кэша эмбеддингов: SHA-256 модели и текста."""
+        return hashlib.sha256(f"{EMBEDDING_TAG}\n{text}".encode("utf-8")).digest()
+    
+    def _get_cached_embeddings(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        """
+        Поиск эмбеддингов в кэше.
+        
+        Args:
+            keys: Ключи кэша
+            
+        Returns:
+            Найденные эмбеддинги по ключам
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        
+        for start in range(0, len(unique_keys), CACHE_LOOKUP_BATCH):
+            batch = unique_keys[start:start + CACHE_LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._emb_cache.execute(
+                f"SELECT hash, vec FROM embeddings WHERE hash IN ({placeholders})", batch
+            )
+            for key, vec in rows:
+                found[key] = np.frombuffer(vec, dtype=np.float16).astype(np.float32).tolist()
+        
+        return found
+    
+    def _store_embeddings(self, keys: List[bytes], vectors: List[List[float]]):
+        """
+        Сохранение новых эмбеддингов в кэш.
+        
+        Args:
+            keys: Ключи кэша
+            vectors: Эмбеддинги
+        """
+        self._emb_cache.executemany(
+            "INSERT OR IGNORE INTO embeddings (hash, vec) VALUES (?, ?)",
+            [(key, np.asarray(vector, dtype=np.float16).tobytes()) for key, vector in zip(keys, vectors)]
+        )
+        self._emb_cache.commit()
+    
+    def _add_to_collection(self, ids: List[str], texts: List[str],
+                           vectors: List[List[float]], metadatas: List[Dict[str, Any]]):
+        """
+        Вставка частей документов с готовыми эмбеддингами в коллекцию Chroma.
+        
+        Args:
+            ids: ID частей
+            texts: Тексты частей
+            vectors: Эмбеддинги частей
+            metadatas: Метаданные частей
+        """
+        collection = self.vectorstore._collection
+        
+        # Chroma не принимает пустые метаданные, такие части вставляем отдельно
+        with_meta = [i for i, metadata in enumerate(metadatas) if metadata]
+        without_meta = [i for i, metadata in enumerate(metadatas) if not metadata]
+        
+        if with_meta:
+            collection.add(
+                ids=[ids[i] for i in with_meta],
+                embeddings=[vectors[i] for i in with_meta],
+                metadatas=[metadatas[i] for i in with_meta],
+                documents=[texts[i] for i in with_meta]
+            )
+        
+        if without_meta:
+            collection.add(
+                ids=[ids[i] for i in without_meta],
+                embeddings=[vectors[i] for i in without_meta],
+                documents=[texts[i] for i in without_meta]
+            )
+        
+        with self._ann_lock:
+            self._ann_version += 1
+            self._ann_stale = True
+    
+    def _embed_query_uncached(self, query: str) -> Tuple[float, ...]:
+        """Эмбеддинг поискового запроса (кэшируется в _embed_query)."""
+        return tuple(self.embeddings.embed_query(query))
+    
+    def _schedule_ann_rebuild(self):
+        """Запуск перестроения индекса IVF-PQ в фоновом потоке, если оно еще не идет."""
+        if not HAS_FAISS or self._ann_index is None:
+            return
+        
+        with self._ann_lock:
+            if not self._ann_stale or (self._ann_thread is not None and self._ann_thread.is_alive()):
+                return
+            self._ann_thread = threading.Thread(target=self._refresh_ann_index, daemon=True)
+            self._ann_thread.start()
+    
+    def _refresh_ann_index(self):
+        """
+        Перестроение индекса IVF-PQ по всем векторам коллекции.
+        
+        Индекс считается актуальным только после успешного построения и только
+        если за время построения в коллекцию ничего не добавили.
+        """
+        with self._ann_lock:
+            version = self._ann_version
+        
+        try:
+            collection = self.vectorstore._collection
+            count = collection.count()
+            
+            if count < ANN_MIN_VECTORS:
+                self._ann_index.clear()
+            else:
+                ids, vectors = [], []
+                for offset in range(0, count, ANN_FETCH_BATCH):
+                    page = collection.get(include=["embeddings"], limit=ANN_FETCH_BATCH, offset=offset)
+                    ids.extend(page["ids"])
+                    vectors.extend(page["embeddings"])
+                
+                # False - индекс неприменим (например, размерность не делится на PQ), ищет Chroma
+                self._ann_index.build(ids, np.asarray(vectors, dtype=np.float32))
+                
+        except Exception as e:
+            logger.error(f"Ошибка перестроения индекса IVF-PQ: {e}")
+            return
+        
+        with self._ann_lock:
+            if self._ann_version == version:
+                self._ann_stale = False
+    
+    def _ann_search(self, query: str, top_k: int) -> Optional[List[Document]]:
+        """
+        Поиск по сжатому индексу IVF-PQ.
+        
+        Args:
+            query: Поисковый запрос
+            top_k: Количество результатов
+            
+        Returns:
+            Список документов или None, если индекс не используется
+            (нет faiss, коллекция слишком мала или индекс еще перестраивается)
+        """
+        if not HAS_FAISS or self._ann_index is None:
+            return None
+        
+        # Пока индекс перестраивается (или после неудачного построения), ищет Chroma
+        if self._ann_stale:
+            self._schedule_ann_rebuild()
+            return None
+        if not self._ann_index.size:
+            return None
+        
+        ids = self._ann_index.search(self._embed_query(query), top_k)
+        found = self.vectorstore._collection.get(ids=ids, include=["documents", "metadatas"])
+        
+        by_id = {
+            doc_id: Document(page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+        }
+        return [by_id[doc_id] for doc_id in ids if doc_id in by_id]
+    
     def search_medical_knowledge(self, query: str, top_k: int = 5) -> List[Document]:
         """
         Поиск релевантной медицинской информации.
@@ -433,11 +952,13 @@ class RAGService:
                 logger.error("Векторное хранилище не инициализировано")
                 return []
             
-            # Поиск по сходству
-            results = self.vectorstore.similarity_search(
-                query=query,
-                k=top_k
-            )
+            # Поиск по сходству: для большой коллекции - по индексу IVF-PQ
+            results = self._ann_search(query, top_k)
+            if results is None:
+                results = self.vectorstore.similarity_search_by_vector(
+                    embedding=list(self._embed_query(query)),
+                    k=top_k
+                )
             
             logger.info(f"Найдено {len(results)} релевантных документов для запроса: {query[:50]}...")
             
@@ -464,8 +985,8 @@ class RAGService:
                 return []
             
             # Поиск с оценками
-            results = self.vectorstore.similarity_search_with_score(
-                query=query,
+            results = self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                embedding=list(self._embed_query(query)),
                 k=top_k
             )
             
@@ -499,12 +1020,18 @@ class RAGService:
                 return self.search_medical_knowledge(query)
             
             # Поиск с фильтром по метаданным
-            results = self.vectorstore.similarity_search(
-                query=query,
+            results = self.vectorstore.similarity_search_by_vector(
+                embedding=list(self._embed_query(query)),
                 k=10,
-                filter={"filename": {"$regex": f".*{category}.*"}}
+                filter={"category": {"$eq": category}}
             )
             
+            # Пустой результат при непустой базе - категория неизвестна или у частей нет
+            # поля category; ищем без фильтра, чтобы не потерять ответ
+            if not results and self.vectorstore._collection.count() > 0:
+                logger.warning(f"В категории {category} ничего не найдено, поиск по всей базе знаний")
+                return self.search_medical_knowledge(query)
+            
             logger.info(f"Найдено {len(results)} документов в категории {category}")
             
             return results
@@ -566,6 +1093,8 @@ class RAGService:
             # Удаляем все документы
             if self.vectorstore:
                 self.vectorstore.delete_collection()
+            if self._ann_index:
+                self._ann_index.clear()
             
             # Пересоздаем хранилище
             self._setup_vectorstore()
@@ -586,14 +1115,14 @@ class RAGService:
             stats = {
                 "knowledge_base_path": self.knowledge_base_path,
                 "vectorstore_initialized": self.vectorstore is not None,
-                "embeddings_model": "text-embedding-ada-002"
+                "embeddings_model": EMBEDDING_MODEL,
+                "embedding_dimensions": EMBEDDING_DIMENSIONS
             }
             
             # Подсчитываем количество документов в папке
             path = Path(self.knowledge_base_path)
             if path.exists():
-                files = list(path.glob("**/*"))
-                stats["files_in_directory"] = len([f for f in files if f.is_file()])
+                stats["files_in_directory"] = sum(1 for _ in _iter_files(str(path)))
             
             # Информация о векторной базе
             if self.vectorstore:
@@ -613,9 +1142,14 @@ class RAGService:
     def close(self):
         """Закрытие соединений и освобождение ресурсов."""
         try:
-            if self.vectorstore:
-                # Сохраняем изменения перед закрытием
-                self.vectorstore.persist()
+            # Изменения уже записаны PersistentClient, сохранять перед закрытием нечего
+            self.vectorstore = None
+            self._chroma_client = None
+            self._ann_index = None
+            
+            if self._emb_cache:
+                self._emb_cache.close()
+                self._emb_cache = None
             
             logger.info("RAG сервис закрыт")
             
@@ -3,9 +3,14 @@ Speech-to-Text service using Yandex Cloud SpeechKit.
 """
 import io
 import grpc
+import atexit
+import queue
 import pyaudio
 import logging
-from typing import Optional, Iterator, Callable, List
+import threading
+import numpy as np
+from functools import lru_cache
+from typing import Optional, Iterator, Callable, List, Dict, ClassVar
 
 # Импортируем протобуфы из локальной папки cloudapi
 from cloudapi.output.yandex.cloud.ai.stt.v3 import stt_pb2
@@ -15,64 +20,164 @@ from config.settings import (
     YANDEX_API_KEY, YANDEX_STT_ENDPOINT, 
     CHUNK_SIZE, CHANNELS, RATE, LANGUAGES
 )
+from services._ogg_opus import HAS_OPUS, OggOpusEncoder
 
 logger = logging.getLogger(__name__)
 
+# Captured chunks buffered between the audio callback and the gRPC sender
+AUDIO_QUEUE_SIZE = 32
+
+# How often the request wrapper thread checks for shutdown, seconds
+WRAPPER_POLL_INTERVAL = 0.1
+
+# Chunks quieter than this RMS (int16 scale) count as silence
+VAD_RMS_THRESHOLD = 300
+
+# Silent chunks still sent after speech so the recognizer can detect the end of utterance
+VAD_HANGOVER_CHUNKS = 5
+
+# During longer silence every Nth chunk is still sent, zeroed, so the stream never goes idle
+VAD_KEEPALIVE_CHUNKS = 10
+
+# Detect a dead connection during long recognition sessions. Pings are sent only while
+# a call is active and no more often than every 30 s: gRPC servers answer more frequent
+# or call-less pings with GOAWAY too_many_pings
+GRPC_CHANNEL_OPTIONS = [
+    ('grpc.keepalive_time_ms', 30000),
+    ('grpc.keepalive_timeout_ms', 5000),
+]
+
+
+def _put_ring(buffer: queue.Queue, item):
+    """Put an item into a bounded queue, dropping the oldest item when it is full."""
+    while True:
+        try:
+            buffer.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def _chunk_rms(data: bytes) -> float:
+    """RMS energy of an int16 PCM chunk."""
+    samples = np.frombuffer(data, dtype=np.int16)
+    if not samples.size:
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(samples, dtype=np.float32))))
+
+
+@lru_cache(maxsize=8)
+def _build_streaming_options(languages: tuple) -> stt_pb2.StreamingOptions:
+    """Build (and cache) streaming recognition options for a set of languages."""
+    # Ogg Opus needs ~10x less upstream bandwidth than raw PCM
+    if HAS_OPUS:
+        audio_format = stt_pb2.AudioFormatOptions(
+            container_audio=stt_pb2.ContainerAudio(
+                container_audio_type=stt_pb2.ContainerAudio.OGG_OPUS
+            )
+        )
+    else:
+        audio_format = stt_pb2.AudioFormatOptions(
+            raw_audio=stt_pb2.RawAudio(
+                audio_encoding=stt_pb2.RawAudio.LINEAR16_PCM,
+                sample_rate_hertz=RATE,
+                audio_channel_count=CHANNELS
+            )
+        )
+    
+    return stt_pb2.StreamingOptions(
+        recognition_model=stt_pb2.RecognitionModelOptions(
+            audio_format=audio_format,
+            text_normalization=stt_pb2.TextNormalizationOptions(
+                text_normalization=stt_pb2.TextNormalizationOptions.TEXT_NORMALIZATION_ENABLED,
+                profanity_filter=True,
+                literature_text=False
+            ),
+            language_restriction=stt_pb2.LanguageRestrictionOptions(
+                restriction_type=stt_pb2.LanguageRestrictionOptions.WHITELIST,
+                language_code=languages
+            ),
+            audio_processing_type=stt_pb2.RecognitionModelOptions.REAL_TIME
+        )
+    )
+
+
 class STTService:
     """Speech-to-Text service using Yandex SpeechKit API."""
     
+    # One TLS channel per endpoint shared by all instances; concurrent
+    # recognitions are multiplexed as HTTP/2 streams
+    _channels: ClassVar[Dict[str, grpc.Channel]] = {}
+    _stubs: ClassVar[Dict[str, stt_service_pb2_grpc.RecognizerStub]] = {}
+    _channel_lock: ClassVar[threading.Lock] = threading.Lock()
+    
     def __init__(self, api_key: Optional[str] = None):
         """Initialize STT service with API key."""
         self.api_key = api_key or YANDEX_API_KEY
         self.format = pyaudio.paInt16
-        self.channel = None
-        self.stub = None
-        self._setup_grpc()
+        self.stub = self._get_stub(YANDEX_STT_ENDPOINT)
+        self.channel = self._channels[YANDEX_STT_ENDPOINT]
     
-    def _setup_grpc(self):
-        """Set up gRPC channel and stub."""
-        try:
-            cred = grpc.ssl_channel_credentials()
-            self.channel = grpc.secure_channel(YANDEX_STT_ENDPOINT, cred)
-            self.stub = stt_service_pb2_grpc.RecognizerStub(self.channel)
-            logger.debug("gRPC channel and stub initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize gRPC: {e}")
-            raise
+    @classmethod
+    def _get_stub(cls, endpoint: str) -> stt_service_pb2_grpc.RecognizerStub:
+        """Get the shared stub for an endpoint, creating its channel on first use."""
+        with cls._channel_lock:
+            if endpoint not in cls._stubs:
+                try:
+                    cred = grpc.ssl_channel_credentials()
+                    channel = grpc.secure_channel(
+                        endpoint, cred,
+                        options=GRPC_CHANNEL_OPTIONS,
+                        compression=grpc.Compression.Gzip
+                    )
+                    if not cls._channels:
+                        atexit.register(cls._close_channels)
+                    cls._channels[endpoint] = channel
+                    cls._stubs[endpoint] = stt_service_pb2_grpc.RecognizerStub(channel)
+                    logger.debug("gRPC channel and stub initialized")
+                except Exception as e:
+                    logger.error(f"Failed to initialize gRPC: {e}")
+                    raise
+            return cls._stubs[endpoint]
+    
+    @classmethod
+    def _close_channels(cls):
+        """Close all shared channels (registered with atexit)."""
+        with cls._channel_lock:
+            for channel in cls._channels.values():
+                channel.close()
+            cls._channels.clear()
+            cls._stubs.clear()
+            logger.debug("STT gRPC channels closed")
     
     def _create_streaming_options(self, languages: List[str] = None) -> stt_pb2.StreamingOptions:
-        """Create streaming recognition options."""
-        if not languages:
-            languages = LANGUAGES
-            
-        return stt_pb2.StreamingOptions(
-            recognition_model=stt_pb2.RecognitionModelOptions(
-                audio_format=stt_pb2.AudioFormatOptions(
-                    raw_audio=stt_pb2.RawAudio(
-                        audio_encoding=stt_pb2.RawAudio.LINEAR16_PCM,
-                        sample_rate_hertz=RATE,
-                        audio_channel_count=CHANNELS
-                    )
-                ),
-                text_normalization=stt_pb2.TextNormalizationOptions(
-                    text_normalization=stt_pb2.TextNormalizationOptions.TEXT_NORMALIZATION_ENABLED,
-                    profanity_filter=True,
-                    literature_text=False
-                ),
-                language_restriction=stt_pb2.LanguageRestrictionOptions(
-                    restriction_type=stt_pb2.LanguageRestrictionOptions.WHITELIST,
-                    language_code=languages
-                ),
-                audio_processing_type=stt_pb2.RecognitionModelOptions.REAL_TIME
-            )
-        )
+        """Create streaming recognition options (built once per language set)."""
+        return _build_streaming_options(tuple(languages or LANGUAGES))
     
-    def _generate_requests(self, callback: Callable = None) -> Iterator[stt_pb2.StreamingRequest]:
-        """Generate streaming requests from microphone input."""
+    def _generate_requests(self, callback: Callable = None,
+                           stop_event: threading.Event = None) -> Iterator[stt_pb2.StreamingRequest]:
+        """
+        Generate streaming requests from microphone input.
+        
+        Args:
+            callback: Optional callback function for status updates
+            stop_event: Set by the caller to end the stream
+        """
         # First, yield the streaming options
         options = self._create_streaming_options()
         yield stt_pb2.StreamingRequest(session_options=options)
         
+        # Capture runs in the PortAudio callback thread, so a slow gRPC send
+        # never stalls the microphone and causes overflow drops
+        audio_queue = queue.Queue(maxsize=AUDIO_QUEUE_SIZE)
+        
+        def on_audio(in_data, frame_count, time_info, status):
+            _put_ring(audio_queue, in_data)
+            return (None, pyaudio.paContinue)
+        
         # Initialize PyAudio
         p = pyaudio.PyAudio()
         stream = p.open(
@@ -80,27 +185,93 @@ class STTService:
             channels=CHANNELS,
             rate=RATE,
             input=True,
-            frames_per_buffer=CHUNK_SIZE
+            frames_per_buffer=CHUNK_SIZE,
+            stream_callback=on_audio
         )
+        stream.start_stream()
         
         logger.info("Listening to microphone... (Press Ctrl+C to stop)")
         if callback:
             callback("start_listening")
             
+        # Encoding and protobuf wrapping run on their own thread; the audio
+        # callback only pushes raw bytes and the gRPC sender only pops requests
+        request_queue = queue.Queue(maxsize=AUDIO_QUEUE_SIZE)
+        stop_event = stop_event or threading.Event()
+        wrapper = threading.Thread(
+            target=self._wrap_audio,
+            args=(audio_queue, request_queue, stop_event),
+            daemon=True
+        )
+        wrapper.start()
+            
         try:
-            while True:
-                data = stream.read(CHUNK_SIZE, exception_on_overflow=False)
-                yield stt_pb2.StreamingRequest(chunk=stt_pb2.AudioChunk(data=data))
+            # A timed get lets the generator notice the stop flag even when no audio arrives
+            while not stop_event.is_set():
+                try:
+                    request = request_queue.get(timeout=WRAPPER_POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                yield request
         except KeyboardInterrupt:
             logger.info("Stopped microphone input")
             if callback:
                 callback("stop_listening")
         finally:
+            stop_event.set()
+            wrapper.join(timeout=1)
             stream.stop_stream()
             stream.close()
             p.terminate()
             logger.debug("Audio resources released")
     
+    def _wrap_audio(self, audio_queue: queue.Queue, request_queue: queue.Queue,
+                    stop_event: threading.Event):
+        """
+        Turn captured audio into streaming requests (runs in a worker thread).
+        
+        Args:
+            audio_queue: Raw PCM chunks from the audio callback
+            request_queue: Output queue of StreamingRequest messages
+            stop_event: Set when the request generator is closed
+        """
+        def put(request):
+            while not stop_event.is_set():
+                try:
+                    request_queue.put(request, timeout=WRAPPER_POLL_INTERVAL)
+                    return
+                except queue.Full:
+                    continue
+        
+        encoder = OggOpusEncoder(RATE, CHANNELS) if HAS_OPUS else None
+        if encoder:
+            put(stt_pb2.StreamingRequest(chunk=stt_pb2.AudioChunk(data=encoder.header())))
+        
+        # Leading silence is not sent at all
+        silence_streak = VAD_HANGOVER_CHUNKS
+        
+        while not stop_event.is_set():
+            try:
+                data = audio_queue.get(timeout=WRAPPER_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            
+            # Beyond the hangover after speech silence is thinned out to keep-alive chunks
+            if _chunk_rms(data) < VAD_RMS_THRESHOLD:
+                silence_streak += 1
+                if silence_streak > VAD_HANGOVER_CHUNKS:
+                    if silence_streak % VAD_KEEPALIVE_CHUNKS:
+                        continue
+                    data = bytes(len(data))
+            else:
+                silence_streak = 0
+            
+            if encoder:
+                data = encoder.encode(data)
+                if not data:
+                    continue
+            put(stt_pb2.StreamingRequest(chunk=stt_pb2.AudioChunk(data=data)))
+    
     def recognize_stream(self, callback: Callable = None) -> Optional[str]:
         """
         Recognize speech from microphone stream.
@@ -114,9 +285,12 @@ class STTService:
         if not self.api_key:
             raise ValueError("API key is not set")
         
+        stop_event = threading.Event()
+        stream_generator = None
+        responses = None
         try:
             metadata = (('authorization', f'Api-Key {self.api_key}'),)
-            stream_generator = self._generate_requests(callback)
+            stream_generator = self._generate_requests(callback, stop_event)
             responses = self.stub.RecognizeStreaming(stream_generator, metadata=metadata)
             
             recognized_text = ""
@@ -125,15 +299,13 @@ class STTService:
                 event_type = response.WhichOneof('Event')
                 
                 if event_type == 'final' and response.final.alternatives:
-                    alternatives = [a.text for a in response.final.alternatives]
-                    recognized_text = alternatives[0]
+                    recognized_text = response.final.alternatives[0].text
                     logger.info(f"Recognized text: {recognized_text}")
                     if callback:
                         callback("recognized", recognized_text)
                     break
                 elif event_type == 'partial' and response.partial.alternatives:
-                    alternatives = [a.text for a in response.partial.alternatives]
-                    partial_text = alternatives[0]
+                    partial_text = response.partial.alternatives[0].text
                     logger.debug(f"Partial text: {partial_text}")
                     if callback:
                         callback("partial", partial_text)
@@ -150,6 +322,17 @@ class STTService:
             if callback:
                 callback("error", str(e))
             raise
+        finally:
+            # Stop the microphone and the RPC as soon as the final result arrives
+            stop_event.set()
+            if responses is not None:
+                responses.cancel()
+            if stream_generator is not None:
+                try:
+                    stream_generator.close()
+                except ValueError:
+                    # Still running in the gRPC sender thread; it exits on the stop flag
+                    pass
     
     def recognize_file(self, file_path: str) -> Optional[str]:
         """
@@ -167,7 +350,6 @@ class STTService:
         return None
         
     def close(self):
-        """Close gRPC channel."""
-        if self.channel:
-            self.channel.close()
-            logger.debug("STT gRPC channel closed")
\ No newline at end of file
+        """Release the service; the shared gRPC channel is closed at interpreter exit."""
+        self.channel = None
+        self.stub = None
\ No newline at end of file
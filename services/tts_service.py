@@ -2,12 +2,28 @@
 Text-to-Speech service using Yandex Cloud SpeechKit.
 """
 import io
+import os
+import re
 import grpc
+import struct
+import asyncio
+import atexit
+import hashlib
 import logging
-from typing import Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Dict, ClassVar, Callable, List
+
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
 
 import pydub
 from pydub import AudioSegment
+from pydub.silence import split_on_silence
 
 # Импортируем протобуфы из локальной папки cloudapi
 from cloudapi.output.yandex.cloud.ai.tts.v3 import tts_pb2
@@ -16,7 +32,7 @@ from cloudapi.output.yandex.cloud.ai.tts.v3 import tts_service_pb2_grpc
 from config.settings import (
     YANDEX_API_KEY, YANDEX_TTS_ENDPOINT,
     VOICE, VOICE_ROLE, VOICE_SPEED,
-    FFMPEG_PATH, FFPROBE_PATH
+    FFMPEG_PATH, FFPROBE_PATH, TTS_CACHE_DIR
 )
 
 # Configure pydub with ffmpeg paths
@@ -26,52 +42,228 @@ AudioSegment.ffmpeg = FFMPEG_PATH
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for synthesized WAV bytes kept in memory
+MEMORY_CACHE_BYTES = 32 * 1024 * 1024
+
+# Upper bound for the on-disk cache; only fixed prompts are written there (persist=True)
+DISK_CACHE_BYTES = 64 * 1024 * 1024
+
+CacheKey = Tuple[str, str, str, float]
+
+# The shared channel stays open between utterances so the next synthesis skips the TLS
+# handshake; keepalive pings run only during calls (gRPC servers answer call-less pings
+# with GOAWAY too_many_pings). Large response messages let long utterances arrive in
+# fewer chunks
+GRPC_CHANNEL_OPTIONS = [
+    ('grpc.keepalive_time_ms', 30000),
+    ('grpc.keepalive_timeout_ms', 5000),
+    ('grpc.max_receive_message_length', 32 * 1024 * 1024),
+]
+
+# How long prewarm() waits for the channel to become ready, seconds
+PREWARM_TIMEOUT = 5.0
+
+# Runs of spaces collapsed in cache keys (line breaks are kept: they are pauses)
+INLINE_WHITESPACE = re.compile(r'[^\S\n]+')
+
+# Sentence boundary used to split long text for streaming playback
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+')
+
+# Initial size of the per-thread receive buffer (grows to the longest utterance seen)
+RECV_BUFFER_SIZE = 1024 * 1024
+
+# Syntheses in flight at once; they are multiplexed over the shared HTTP/2 channel
+TTS_CONCURRENT_REQUESTS = 3
+
+# Separator between texts of a batch and the pause used to split its audio back
+BATCH_SEPARATOR = "\n\n"
+BATCH_SILENCE_MS = 400
+BATCH_SILENCE_THRESH_DBFS = -40
+
+# Fade applied at sentence edges to avoid clicks between chunks, ms
+CHUNK_FADE_MS = 2
+
+# Request with the default audio spec and voice hints; copied and filled in per call
+_REQUEST_TEMPLATE = tts_pb2.UtteranceSynthesisRequest(
+    output_audio_spec=tts_pb2.AudioFormatOptions(
+        container_audio=tts_pb2.ContainerAudio(
+            container_audio_type=tts_pb2.ContainerAudio.WAV
+        )
+    ),
+    hints=[
+        tts_pb2.Hints(voice=VOICE),
+        tts_pb2.Hints(role=VOICE_ROLE),
+        tts_pb2.Hints(speed=VOICE_SPEED),
+    ],
+    loudness_normalization_type=tts_pb2.UtteranceSynthesisRequest.LUFS
+)
+
+
+def _split_sentences(text: str) -> List[str]:
+    """Split text into sentences, dropping empty pieces."""
+    return [sentence for sentence in SENTENCE_BOUNDARY.split(text.strip()) if sentence]
+
+
+def _wav_to_segment(wav_bytes: bytes) -> AudioSegment:
+    """
+    Build an AudioSegment from PCM WAV bytes.
+    
+    Only the RIFF chunk headers are walked to locate the format and the PCM
+    data; anything unexpected goes through pydub's regular WAV reader.
+    
+    Args:
+        wav_bytes: WAV file contents
+        
+    Returns:
+        AudioSegment with the PCM samples
+    """
+    view = memoryview(wav_bytes)
+    fmt = None
+    pos = 12
+    if view[:4] == b"RIFF" and view[8:12] == b"WAVE":
+        while pos + 8 <= len(view):
+            chunk_id = bytes(view[pos:pos + 4])
+            chunk_size, = struct.unpack_from("<I", view, pos + 4)
+            pos += 8
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack_from("<HHIIHH", view, pos)
+            elif chunk_id == b"data" and fmt is not None and fmt[0] == 1:
+                _, channels, rate, _, _, bits = fmt
+                # Streamed WAV may declare an unknown (0 or 0xFFFFFFFF) data size
+                end = len(view) if chunk_size in (0, 0xFFFFFFFF) else min(len(view), pos + chunk_size)
+                return AudioSegment(
+                    data=bytes(view[pos:end]),
+                    sample_width=bits // 8,
+                    frame_rate=rate,
+                    channels=channels
+                )
+            pos += chunk_size + (chunk_size & 1)
+    
+    return AudioSegment.from_wav(io.BytesIO(wav_bytes))
+
+
 class TTSService:
     """Text-to-Speech service using Yandex SpeechKit API."""
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize TTS service with API key."""
+    # One TLS channel per endpoint shared by all instances
+    _channels: ClassVar[Dict[str, grpc.Channel]] = {}
+    _stubs: ClassVar[Dict[str, tts_service_pb2_grpc.SynthesizerStub]] = {}
+    _channel_lock: ClassVar[threading.Lock] = threading.Lock()
+    
+    def __init__(self, api_key: Optional[str] = None, cache_dir: Optional[str] = TTS_CACHE_DIR):
+        """
+        Initialize TTS service with API key.
+        
+        Args:
+            api_key: Yandex Cloud API key
+            cache_dir: Directory for the on-disk WAV cache, None to disable it
+        """
         self.api_key = api_key or YANDEX_API_KEY
         self.channel = None
         self.stub = None
+        self.cache_dir = cache_dir
+        
+        # LRU of raw WAV bytes keyed on (text, voice, role, speed)
+        self._cache: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_lock = threading.Lock()
+        
+        # Receive buffer reused across syntheses. One per thread: synthesize_stream runs
+        # RPCs on the persistent pipeline thread, synthesize_async on the event loop's
+        # executor threads, and several of them can receive at once
+        self._recv = threading.local()
+        
+        # Concurrency limit for synthesize_async, recreated per event loop
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._sem_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Worker that synthesizes the next sentence during playback, created on first use
+        self._pipeline: Optional[ThreadPoolExecutor] = None
+        self._pipeline_lock = threading.Lock()
+        
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        
         self._setup_grpc()
         
     def _setup_grpc(self):
-        """Set up gRPC channel and stub."""
+        """Set up gRPC channel and stub from the shared pool."""
+        self.stub = self._get_stub(YANDEX_TTS_ENDPOINT)
+        self.channel = self._channels[YANDEX_TTS_ENDPOINT]
+    
+    @classmethod
+    def _get_stub(cls, endpoint: str) -> tts_service_pb2_grpc.SynthesizerStub:
+        """Get the shared stub for an endpoint, creating its channel on first use."""
+        with cls._channel_lock:
+            if endpoint not in cls._stubs:
+                try:
+                    cred = grpc.ssl_channel_credentials()
+                    channel = grpc.secure_channel(
+                        endpoint, cred,
+                        options=GRPC_CHANNEL_OPTIONS,
+                        compression=grpc.Compression.Gzip
+                    )
+                    if not cls._channels:
+                        atexit.register(cls._close_channels)
+                    cls._channels[endpoint] = channel
+                    cls._stubs[endpoint] = tts_service_pb2_grpc.SynthesizerStub(channel)
+                    logger.debug("TTS gRPC channel and stub initialized")
+                except Exception as e:
+                    logger.error(f"Failed to initialize TTS gRPC: {e}")
+                    raise
+            return cls._stubs[endpoint]
+    
+    @classmethod
+    def _close_channels(cls):
+        """Close all shared channels (registered with atexit)."""
+        with cls._channel_lock:
+            for channel in cls._channels.values():
+                channel.close()
+            cls._channels.clear()
+            cls._stubs.clear()
+            logger.debug("TTS gRPC channels closed")
+    
+    @classmethod
+    def prewarm(cls, endpoint: str = YANDEX_TTS_ENDPOINT, timeout: float = PREWARM_TIMEOUT) -> bool:
+        """
+        Connect the shared channel ahead of the first synthesis.
+        
+        Args:
+            endpoint: TTS endpoint to connect to
+            timeout: Maximum time to wait for the connection, seconds
+            
+        Returns:
+            True if the channel is ready, False otherwise
+        """
+        cls._get_stub(endpoint)
         try:
-            cred = grpc.ssl_channel_credentials()
-            self.channel = grpc.secure_channel(YANDEX_TTS_ENDPOINT, cred)
-            self.stub = tts_service_pb2_grpc.SynthesizerStub(self.channel)
-            logger.debug("TTS gRPC channel and stub initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize TTS gRPC: {e}")
-            raise
+            grpc.channel_ready_future(cls._channels[endpoint]).result(timeout=timeout)
+            logger.debug("TTS gRPC channel is ready")
+            return True
+        except grpc.FutureTimeoutError:
+            logger.warning(f"TTS gRPC channel not ready after {timeout}s")
+            return False
     
     def _create_synthesis_request(self, text: str, voice: str = None, 
                                  role: str = None, speed: float = None) -> tts_pb2.UtteranceSynthesisRequest:
         """Create a synthesis request with specified parameters."""
-        # Use defaults if not specified
-        voice = voice or VOICE
-        role = role or VOICE_ROLE
-        speed = speed or VOICE_SPEED
-        
-        return tts_pb2.UtteranceSynthesisRequest(
-            text=text,
-            output_audio_spec=tts_pb2.AudioFormatOptions(
-                container_audio=tts_pb2.ContainerAudio(
-                    container_audio_type=tts_pb2.ContainerAudio.WAV
-                )
-            ),
-            hints=[
-                tts_pb2.Hints(voice=voice),
-                tts_pb2.Hints(role=role),
-                tts_pb2.Hints(speed=speed),
-            ],
-            loudness_normalization_type=tts_pb2.UtteranceSynthesisRequest.LUFS
-        )
+        request = tts_pb2.UtteranceSynthesisRequest()
+        request.CopyFrom(_REQUEST_TEMPLATE)
+        request.text = text
+        
+        # Only non-default hints are rewritten in the copied template
+        if voice and voice != VOICE:
+            request.hints[0].voice = voice
+        if role and role != VOICE_ROLE:
+            request.hints[1].role = role
+        if speed and speed != VOICE_SPEED:
+            request.hints[2].speed = speed
+        
+        return request
     
     def synthesize(self, text: str, voice: str = None, 
-                  role: str = None, speed: float = None) -> Optional[AudioSegment]:
+                  role: str = None, speed: float = None,
+                  persist: bool = False) -> Optional[AudioSegment]:
         """
         Synthesize speech from text.
         
@@ -80,6 +272,8 @@ class TTSService:
             voice: Voice identifier
             role: Voice role (friendly, neutral, etc.)
             speed: Speech speed factor
+            persist: Also keep the audio in the on-disk cache; use only for
+                fixed prompts, never for text that may contain patient data
             
         Returns:
             AudioSegment object or None if synthesis failed
@@ -88,28 +282,144 @@ class TTSService:
             logger.warning("Empty text for synthesis")
             return None
             
+        wav_bytes = self._synthesize_wav_bytes(text, voice, role, speed, persist)
+        
+        try:
+            audio_segment = _wav_to_segment(wav_bytes)
+            logger.debug(f"Audio synthesized, duration: {len(audio_segment)/1000:.2f}s")
+            return audio_segment
+        except Exception as e:
+            logger.error(f"TTS general error: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _cache_key(text: str, voice: str = None, role: str = None, speed: float = None) -> CacheKey:
+        """Normalized cache key; defaults are resolved so equal requests share a key."""
+        return (INLINE_WHITESPACE.sub(" ", text).strip(), voice or VOICE, role or VOICE_ROLE, float(speed or VOICE_SPEED))
+    
+    def _cache_path(self, key: CacheKey) -> str:
+        """Path of the on-disk cache entry for a key (content-addressed by the canonical key)."""
+        canonical = "|".join(map(str, key)).encode("utf-8")
+        if HAS_XXHASH:
+            digest = xxhash.xxh3_64_hexdigest(canonical)
+        else:
+            digest = hashlib.sha1(canonical).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.wav")
+    
+    def _cache_get(self, key: CacheKey) -> Optional[bytes]:
+        """Look a key up in the memory cache, then on disk."""
+        with self._cache_lock:
+            wav_bytes = self._cache.get(key)
+            if wav_bytes is not None:
+                self._cache.move_to_end(key)
+                return wav_bytes
+        
+        if not self.cache_dir:
+            return None
+        
+        try:
+            with open(self._cache_path(key), 'rb') as f:
+                wav_bytes = f.read()
+        except OSError:
+            return None
+        
+        self._cache_put(key, wav_bytes, persist=False)
+        return wav_bytes
+    
+    def _cache_put(self, key: CacheKey, wav_bytes: bytes, persist: bool = False):
+        """Store WAV bytes in the memory cache (evicting by size) and optionally on disk."""
+        with self._cache_lock:
+            if key not in self._cache:
+                self._cache[key] = wav_bytes
+                self._cache_bytes += len(wav_bytes)
+            while self._cache_bytes > MEMORY_CACHE_BYTES and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+        
+        if persist and self.cache_dir:
+            path = self._cache_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(wav_bytes)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"Failed to write TTS cache entry: {e}")
+                return
+            self._trim_disk_cache()
+    
+    def _trim_disk_cache(self):
+        """Delete the oldest on-disk entries while the cache exceeds DISK_CACHE_BYTES."""
+        try:
+            entries = []
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".wav"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            logger.error(f"Failed to scan TTS cache: {e}")
+            return
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= DISK_CACHE_BYTES:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+    
+    def _recv_buffer(self) -> bytearray:
+        """Receive buffer of the calling thread."""
+        buf = getattr(self._recv, "buf", None)
+        if buf is None:
+            buf = self._recv.buf = bytearray(RECV_BUFFER_SIZE)
+        return buf
+    
+    def _synthesize_wav_bytes(self, text: str, voice: str = None,
+                              role: str = None, speed: float = None,
+                              persist: bool = False) -> bytes:
+        """
+        Synthesize text into WAV bytes, serving repeated phrases from the cache.
+        
+        Args:
+            text: Text to synthesize
+            voice, role, speed, persist: Same as in synthesize()
+            
+        Returns:
+            WAV file contents
+        """
+        key = self._cache_key(text, voice, role, speed)
+        wav_bytes = self._cache_get(key)
+        if wav_bytes is not None:
+            logger.debug(f"TTS cache hit: {text[:50]}{'...' if len(text) > 50 else ''}")
+            return wav_bytes
+            
         if not self.api_key:
             raise ValueError("API key is not set")
             
-        request = self._create_synthesis_request(text, voice, role, speed)
+        request = self._create_synthesis_request(key[0], *key[1:])
         logger.info(f"Synthesizing text: {text[:50]}{'...' if len(text) > 50 else ''}")
         
         try:
             metadata = (('authorization', f'Api-Key {self.api_key}'),)
             response_iterator = self.stub.UtteranceSynthesis(request, metadata=metadata)
             
-            audio_data = io.BytesIO()
+            # Chunks are copied into the existing capacity; the buffer only grows
+            buf = self._recv_buffer()
+            size = 0
             for response in response_iterator:
-                audio_data.write(response.audio_chunk.data)
+                data = response.audio_chunk.data
+                end = size + len(data)
+                if end > len(buf):
+                    buf.extend(bytes(max(end, 2 * len(buf)) - len(buf)))
+                buf[size:end] = data
+                size = end
                 
-            # Reset position for reading
-            audio_data.seek(0)
-            
-            # Convert to AudioSegment
-            audio_segment = AudioSegment.from_wav(audio_data)
-            logger.debug(f"Audio synthesized, duration: {len(audio_segment)/1000:.2f}s")
-            
-            return audio_segment
+            with memoryview(buf) as view:
+                wav_bytes = bytes(view[:size])
             
         except grpc.RpcError as err:
             logger.error(f"TTS gRPC error: {err.details()} (Code: {err.code()})")
@@ -117,34 +427,197 @@ class TTSService:
         except Exception as e:
             logger.error(f"TTS general error: {str(e)}")
             raise
+        
+        self._cache_put(key, wav_bytes, persist=persist)
+        return wav_bytes
+    
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Concurrency semaphore bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._sem_loop is not loop:
+            self._sem = asyncio.Semaphore(TTS_CONCURRENT_REQUESTS)
+            self._sem_loop = loop
+        return self._sem
+    
+    async def synthesize_async(self, text: str, voice: str = None,
+                               role: str = None, speed: float = None) -> Optional[AudioSegment]:
+        """
+        Asynchronous version of synthesize().
+        
+        At most TTS_CONCURRENT_REQUESTS calls run at once; each blocking RPC runs
+        in a worker thread over the shared channel.
+        
+        Args:
+            text: Text to synthesize
+            voice, role, speed: Same as in synthesize()
+            
+        Returns:
+            AudioSegment object or None if synthesis failed
+        """
+        if not text:
+            logger.warning("Empty text for synthesis")
+            return None
+        
+        async with self._semaphore():
+            wav_bytes = await asyncio.to_thread(self._synthesize_wav_bytes, text, voice, role, speed)
+        
+        return _wav_to_segment(wav_bytes)
+    
+    async def synthesize_many(self, texts: List[str], voice: str = None,
+                              role: str = None, speed: float = None) -> List[Optional[AudioSegment]]:
+        """
+        Synthesize several texts concurrently.
+        
+        Args:
+            texts: Texts to synthesize
+            voice, role, speed: Same as in synthesize()
+            
+        Returns:
+            AudioSegment for each text, None where synthesis failed
+        """
+        results = await asyncio.gather(
+            *[self.synthesize_async(text, voice, role, speed) for text in texts],
+            return_exceptions=True
+        )
+        
+        audio_segments = []
+        for text, result in zip(texts, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to synthesize '{text[:50]}': {result}")
+                result = None
+            audio_segments.append(result)
+        return audio_segments
+    
+    def synthesize_batch(self, texts: List[str], voice: str = None,
+                         role: str = None, speed: float = None) -> List[Optional[AudioSegment]]:
+        """
+        Synthesize several short texts with a single request.
+        
+        The texts are joined with paragraph breaks and the audio is split back
+        on the pauses between them. If the split does not produce one segment
+        per text, each text is synthesized separately.
+        
+        Args:
+            texts: Texts to synthesize
+            voice, role, speed: Same as in synthesize()
+            
+        Returns:
+            AudioSegment for each text (None for empty texts)
+        """
+        indices = [i for i, text in enumerate(texts) if text and text.strip()]
+        results: List[Optional[AudioSegment]] = [None] * len(texts)
+        if not indices:
+            return results
+        
+        if len(indices) > 1:
+            joined = BATCH_SEPARATOR.join(texts[i].strip() for i in indices)
+            audio = _wav_to_segment(self._synthesize_wav_bytes(joined, voice, role, speed))
+            segments = split_on_silence(
+                audio,
+                min_silence_len=BATCH_SILENCE_MS,
+                silence_thresh=BATCH_SILENCE_THRESH_DBFS
+            )
+            if len(segments) == len(indices):
+                for i, segment in zip(indices, segments):
+                    results[i] = segment
+                return results
+            logger.debug(f"Batch split into {len(segments)} segments for {len(indices)} texts, "
+                         f"synthesizing separately")
+        
+        for i in indices:
+            results[i] = self.synthesize(texts[i], voice, role, speed)
+        return results
+    
+    def _pipeline_executor(self) -> ThreadPoolExecutor:
+        """Single-thread executor shared by synthesize_stream calls."""
+        with self._pipeline_lock:
+            if self._pipeline is None:
+                self._pipeline = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-pipeline")
+            return self._pipeline
+    
+    def synthesize_stream(self, text: str, voice: str = None, role: str = None,
+                          speed: float = None, play: Callable[[AudioSegment], None] = None,
+                          persist: bool = False) -> bool:
+        """
+        Synthesize and play text sentence by sentence.
+        
+        The next sentence is synthesized while the current one is playing, so
+        playback starts after the first sentence instead of the whole text.
+        
+        Args:
+            text: Text to synthesize
+            voice, role, speed, persist: Same as in synthesize()
+            play: Playback function, AudioPlayer.play_audio_segment by default
+            
+        Returns:
+            True if anything was played, False otherwise
+        """
+        sentences = _split_sentences(text or "")
+        if not sentences:
+            logger.warning("Empty text for synthesis")
+            return False
+        
+        if play is None:
+            from utils.audio_utils import AudioPlayer
+            play = AudioPlayer.play_audio_segment
+        
+        pool = self._pipeline_executor()
+        future = pool.submit(self._synthesize_wav_bytes, sentences[0], voice, role, speed, persist)
+        try:
+            for next_sentence in sentences[1:] + [None]:
+                wav_bytes = future.result()
+                if next_sentence is not None:
+                    future = pool.submit(self._synthesize_wav_bytes, next_sentence, voice, role, speed, persist)
+                
+                audio = _wav_to_segment(wav_bytes)
+                play(audio.fade_in(CHUNK_FADE_MS).fade_out(CHUNK_FADE_MS))
+        except BaseException:
+            # Don't synthesize a sentence nobody will hear
+            future.cancel()
+            raise
+        
+        return True
     
     def synthesize_to_file(self, text: str, output_file: str, 
                           voice: str = None, role: str = None, 
-                          speed: float = None) -> bool:
+                          speed: float = None, format: str = "wav") -> bool:
         """
         Synthesize speech and save to file.
         
+        WAV output is written as received from the server; other formats are
+        converted through pydub/ffmpeg.
+        
         Args:
             text: Text to synthesize
             output_file: Path to save the audio file
             voice, role, speed: Same as in synthesize()
+            format: Output file format
             
         Returns:
             True if successful, False otherwise
         """
-        try:
-            audio = self.synthesize(text, voice, role, speed)
-            if audio:
-                audio.export(output_file, format="wav")
-                logger.info(f"Audio saved to {output_file}")
-                return True
+        if not text:
+            logger.warning("Empty text for synthesis")
             return False
+            
+        try:
+            wav_bytes = self._synthesize_wav_bytes(text, voice, role, speed)
+            if format == "wav":
+                with open(output_file, 'wb') as f:
+                    f.write(wav_bytes)
+            else:
+                _wav_to_segment(wav_bytes).export(output_file, format=format)
+            logger.info(f"Audio saved to {output_file}")
+            return True
         except Exception as e:
             logger.error(f"Failed to save audio: {str(e)}")
             return False
     
     def close(self):
-        """Close gRPC channel."""
-        if self.channel:
-            self.channel.close()
-            logger.debug("TTS gRPC channel closed")
\ No newline at end of file
+        """Release the service; the shared gRPC channel is closed at interpreter exit."""
+        with self._pipeline_lock:
+            if self._pipeline is not None:
+                self._pipeline.shutdown(wait=False, cancel_futures=True)
+                self._pipeline = None
+        self.channel = None
+        self.stub = None
\ No newline at end of file
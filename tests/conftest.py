@@ -0,0 +1,60 @@
+"""
+Общие настройки тестов: корень проекта в sys.path для импорта services
+и фабрика RAG сервиса без обращений к OpenAI.
+"""
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeEmbeddings:
+    """Детерминированные эмбеддинги вместо OpenAIEmbeddings."""
+    
+    def __init__(self, dimensions, **kwargs):
+        self.dimensions = dimensions
+    
+    def _vector(self, text):
+        return [float(len(text) % 7 + 1)] * self.dimensions
+    
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+    
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+@pytest.fixture
+def make_rag_service(monkeypatch):
+    """
+    Фабрика RAG сервиса, создаваемого обычным конструктором.
+    
+    Эмбеддинги OpenAI и разделитель текста (скачивает словарь tiktoken)
+    заменены, начальные документы не загружаются; Chroma настоящая,
+    в папке теста. Созданные сервисы закрываются после теста.
+    """
+    rag_service = pytest.importorskip("services.rag_service")
+    monkeypatch.setattr(rag_service, "OpenAIEmbeddings", FakeEmbeddings)
+    monkeypatch.setattr(
+        rag_service, "TextSplitter",
+        types.SimpleNamespace(from_tiktoken_model=lambda *args, **kwargs: None)
+    )
+    monkeypatch.setattr(rag_service.RAGService, "_load_initial_documents", lambda self: None)
+    
+    services = []
+    
+    def make(knowledge_base_path):
+        service = rag_service.RAGService(
+            openai_api_key="test",
+            knowledge_base_path=str(knowledge_base_path)
+        )
+        services.append(service)
+        return service
+    
+    yield make
+    
+    for service in services:
+        service.close()
\ No newline at end of file
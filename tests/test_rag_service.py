@@ -0,0 +1,46 @@
+"""
+Тесты RAG сервиса: миграция схемы коллекции Chroma.
+"""
+import os
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+rag_service = pytest.importorskip("services.rag_service")
+
+
+def test_collection_with_old_schema_is_recreated(tmp_path, make_rag_service):
+    """Коллекция старой модели эмбеддингов (1536 измерений) пересоздается."""
+    client = chromadb.PersistentClient(path=os.path.join(tmp_path, "chroma_db"))
+    old = client.create_collection(
+        rag_service.COLLECTION_NAME,
+        metadata={"schema": "text-embedding-ada-002"},
+        embedding_function=None
+    )
+    old.add(ids=["old"], embeddings=[[0.1] * 1536], documents=["старый текст"])
+    
+    service = make_rag_service(tmp_path)
+    
+    collection = service.vectorstore._collection
+    assert collection.count() == 0
+    assert collection.metadata["schema"] == rag_service.COLLECTION_SCHEMA
+
+
+def test_collection_with_current_schema_is_kept(tmp_path, make_rag_service):
+    """Коллекция текущей схемы открывается без потери данных."""
+    client = chromadb.PersistentClient(path=os.path.join(tmp_path, "chroma_db"))
+    current = client.create_collection(
+        rag_service.COLLECTION_NAME,
+        metadata={"schema": rag_service.COLLECTION_SCHEMA},
+        embedding_function=None
+    )
+    current.add(
+        ids=["doc"],
+        embeddings=[[0.1] * rag_service.EMBEDDING_DIMENSIONS],
+        documents=["текст"],
+        metadatas=[{"category": "services"}]
+    )
+    
+    service = make_rag_service(tmp_path)
+    
+    assert service.vectorstore._collection.count() == 1
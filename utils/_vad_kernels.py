@@ -0,0 +1,69 @@
+"""
+Energy kernel for the voice activity detector.
+
+A chunk of int16 PCM is cut into short sub-windows, the RMS of each window is
+smoothed with an exponentially weighted moving average, and the peak smoothed
+level is reported. With numba the loop is compiled into a single pass over the
+samples; otherwise a NumPy implementation is used.
+"""
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def smoothed_rms_peak(samples, window, alpha, level):
+        """
+        Smoothed RMS energy of a chunk.
+
+        Args:
+            samples: int16 PCM samples
+            window: Sub-window length in samples
+            alpha: EWMA weight of the newest window (0..1]
+            level: Smoothed level carried over from the previous chunk
+
+        Returns:
+            (peak smoothed level within the chunk, smoothed level at its end)
+        """
+        n = samples.shape[0]
+        peak = 0.0
+        for base in range(0, n, window):
+            end = min(base + window, n)
+            acc = 0.0
+            for i in range(base, end):
+                x = np.float64(samples[i])
+                acc += x * x
+            level = alpha * np.sqrt(acc / (end - base)) + (1.0 - alpha) * level
+            if level > peak:
+                peak = level
+        return peak, level
+else:
+    def smoothed_rms_peak(samples, window, alpha, level):
+        """NumPy version of the numba kernel (same arguments and result)."""
+        n = samples.shape[0]
+        x = samples.astype(np.float64)
+        if n <= window:
+            # Short chunk: one dot product, no reshaping or temporaries per window
+            energies = [float(np.dot(x, x)) / n] if n else []
+        else:
+            full = n - n % window
+            windows = x[:full].reshape(-1, window)
+            energies = np.einsum('ij,ij->i', windows, windows) / window
+            if full < n:
+                tail = x[full:]
+                energies = np.append(energies, np.dot(tail, tail) / (n - full))
+            energies = energies.tolist()
+
+        peak = 0.0
+        for energy in energies:
+            level = alpha * math.sqrt(energy) + (1.0 - alpha) * level
+            if level > peak:
+                peak = level
+        return peak, level
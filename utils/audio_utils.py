@@ -4,9 +4,11 @@ Audio handling utilities for the Medical AI Agent.
 import os
 import time
 import wave
+import atexit
 import logging
 import tempfile
-from threading import Thread
+from collections import deque
+from threading import Thread, Lock, Event, current_thread
 from typing import Optional, Callable
 
 import pyaudio
@@ -14,28 +16,89 @@ import numpy as np
 from pydub import AudioSegment
 from pydub.playback import play
 
+from utils._vad_kernels import smoothed_rms_peak
+
 logger = logging.getLogger(__name__)
 
+# Default recording length kept by AudioRecorder; older audio is overwritten
+MAX_RECORD_SECONDS = 300
+
+# Frames per write when streaming a WAV file to the output device
+PLAYBACK_CHUNK_FRAMES = 4096
+
+# Captured chunks waiting for the recorder callback; the oldest are dropped beyond this
+CALLBACK_QUEUE_SIZE = 64
+
+# VAD energy sub-window length, ms
+VAD_WINDOW_MS = 10
+
 class AudioRecorder:
     """Class for recording audio from microphone."""
     
-    def __init__(self, channels=1, rate=8000, chunk_size=4000):
+    def __init__(self, channels=1, rate=8000, chunk_size=4000, max_seconds=MAX_RECORD_SECONDS):
         """
         Initialize audio recorder.
         
         Args:
             channels: Number of audio channels
             rate: Sample rate in Hz
-            chunk_size: Size of audio chunks to process
+            chunk_size: Size of audio chunks to process, in frames (samples per channel)
+            max_seconds: Longest recording kept; beyond it the oldest audio is overwritten
         """
         self.channels = channels
         self.rate = rate
         self.chunk_size = chunk_size
+        self.max_seconds = max_seconds
         self.format = pyaudio.paInt16
         self.pyaudio = None
         self.stream = None
         self.recording = False
-        self.frames = []
+        
+        # Ring buffer of int16 samples, power-of-two sized so wrap-around is a mask;
+        # written only by the PortAudio callback
+        self._buf = np.empty(0, dtype=np.int16)
+        self._mask = 0
+        self._write_idx = 0
+        
+        # Chunks handed from the PortAudio callback to the consumer thread
+        self._callback = None
+        self._pending = deque(maxlen=CALLBACK_QUEUE_SIZE)
+        self._data_ready = Event()
+        self._consumer = None
+    
+    def _allocate_buffer(self):
+        """Allocate the ring buffer for max_seconds of audio."""
+        samples = max(1, int(self.max_seconds * self.rate * self.channels))
+        capacity = 1 << (samples - 1).bit_length()
+        if len(self._buf) != capacity:
+            self._buf = np.empty(capacity, dtype=np.int16)
+        self._mask = capacity - 1
+        self._write_idx = 0
+    
+    def _write(self, data: bytes):
+        """Copy a captured chunk into the ring buffer."""
+        samples = np.frombuffer(data, dtype=np.int16)
+        n = len(samples)
+        capacity = len(self._buf)
+        if n > capacity:
+            samples = samples[-capacity:]
+            self._write_idx += n - capacity
+            n = capacity
+        
+        pos = self._write_idx & self._mask
+        first = min(n, capacity - pos)
+        self._buf[pos:pos + first] = samples[:first]
+        self._buf[:n - first] = samples[first:]
+        self._write_idx += n
+    
+    def _recorded_bytes(self) -> bytes:
+        """Recorded samples in chronological order."""
+        capacity = len(self._buf)
+        if self._write_idx <= capacity:
+            return self._buf[:self._write_idx].tobytes()
+        
+        pos = self._write_idx & self._mask
+        return self._buf[pos:].tobytes() + self._buf[:pos].tobytes()
     
     def start(self, callback: Optional[Callable] = None):
         """
@@ -49,38 +112,55 @@ class AudioRecorder:
             return
             
         self.pyaudio = pyaudio.PyAudio()
-        self.frames = []
+        self._allocate_buffer()
         self.recording = True
         
         try:
+            # PortAudio delivers chunks from its own thread; the user callback
+            # runs in a separate consumer so it can never stall capture
+            self._callback = callback
+            self._pending.clear()
+            self._data_ready.clear()
+            if callback:
+                self._consumer = Thread(target=self._deliver, args=(callback,), daemon=True)
+                self._consumer.start()
+            
             self.stream = self.pyaudio.open(
                 format=self.format,
                 channels=self.channels,
                 rate=self.rate,
                 input=True,
-                frames_per_buffer=self.chunk_size
+                frames_per_buffer=self.chunk_size,
+                stream_callback=self._on_audio
             )
             
             logger.info("Started recording")
             
-            def record_thread():
-                while self.recording:
-                    try:
-                        data = self.stream.read(self.chunk_size, exception_on_overflow=False)
-                        self.frames.append(data)
-                        if callback:
-                            callback(data)
-                    except Exception as e:
-                        logger.error(f"Error recording audio: {e}")
-                        break
-            
-            Thread(target=record_thread, daemon=True).start()
-            
         except Exception as e:
             logger.error(f"Failed to start recording: {e}")
             self.stop()
             raise
     
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PortAudio stream callback: store the chunk and queue it for the user callback."""
+        self._write(in_data)
+        if self._callback:
+            self._pending.append(in_data)
+            self._data_ready.set()
+        return (None, pyaudio.paContinue)
+    
+    def _deliver(self, callback: Callable):
+        """Consumer thread passing captured chunks to the user callback."""
+        while self.recording or self._pending:
+            self._data_ready.wait(timeout=0.1)
+            self._data_ready.clear()
+            while self._pending:
+                data = self._pending.popleft()
+                try:
+                    callback(data)
+                except Exception as e:
+                    logger.error(f"Error in recording callback: {e}")
+    
     def stop(self) -> Optional[bytes]:
         """
         Stop recording and return the recorded audio data.
@@ -102,13 +182,19 @@ class AudioRecorder:
         if self.pyaudio:
             self.pyaudio.terminate()
             self.pyaudio = None
+        
+        self._callback = None
+        self._data_ready.set()
+        if self._consumer and self._consumer is not current_thread():
+            self._consumer.join()
+        self._consumer = None
             
-        logger.info(f"Stopped recording, captured {len(self.frames)} frames")
+        logger.info(f"Stopped recording, captured {self._write_idx // self.channels} frames")
         
-        if not self.frames:
+        if not self._write_idx:
             return None
             
-        return b''.join(self.frames)
+        return self._recorded_bytes()
     
     def save_to_wav(self, filepath: str) -> bool:
         """
@@ -120,7 +206,7 @@ class AudioRecorder:
         Returns:
             True if successful, False otherwise
         """
-        if not self.frames:
+        if not self._write_idx:
             logger.warning("No audio data to save")
             return False
             
@@ -129,7 +215,7 @@ class AudioRecorder:
                 wf.setnchannels(self.channels)
                 wf.setsampwidth(2)  # 16-bit
                 wf.setframerate(self.rate)
-                wf.writeframes(b''.join(self.frames))
+                wf.writeframes(self._recorded_bytes())
                 
             logger.info(f"Audio saved to {filepath}")
             return True
@@ -141,6 +227,27 @@ class AudioRecorder:
 class AudioPlayer:
     """Class for playing audio."""
     
+    # PortAudio is initialized once and reused for every playback
+    _pa = None
+    _pa_lock = Lock()
+    
+    @classmethod
+    def _get_pyaudio(cls) -> pyaudio.PyAudio:
+        """Get the shared PyAudio instance, initializing it on first use."""
+        with cls._pa_lock:
+            if cls._pa is None:
+                cls._pa = pyaudio.PyAudio()
+                atexit.register(cls._terminate)
+            return cls._pa
+    
+    @classmethod
+    def _terminate(cls):
+        """Release PortAudio (registered with atexit)."""
+        with cls._pa_lock:
+            if cls._pa is not None:
+                cls._pa.terminate()
+                cls._pa = None
+    
     @staticmethod
     def play_audio_segment(audio_segment: AudioSegment):
         """
@@ -160,9 +267,35 @@ class AudioPlayer:
         """
         Play WAV file.
         
+        PCM WAV is streamed from disk straight to PyAudio; other encodings go
+        through pydub/ffmpeg.
+        
         Args:
             filepath: Path to WAV file
         """
+        try:
+            with wave.open(filepath, 'rb') as wf:
+                pa = AudioPlayer._get_pyaudio()
+                stream = pa.open(
+                    format=pa.get_format_from_width(wf.getsampwidth()),
+                    channels=wf.getnchannels(),
+                    rate=wf.getframerate(),
+                    output=True
+                )
+                logger.info(f"Playing {filepath}, duration: {wf.getnframes()/wf.getframerate():.2f}s")
+                try:
+                    while data := wf.readframes(PLAYBACK_CHUNK_FRAMES):
+                        stream.write(data)
+                    stream.stop_stream()
+                except Exception as e:
+                    logger.error(f"Failed to play WAV file: {e}")
+                finally:
+                    stream.close()
+            return
+        except Exception as e:
+            # Not PCM WAV or no output stream: decode and play through pydub
+            logger.debug(f"Direct WAV playback unavailable, using pydub: {e}")
+            
         try:
             audio = AudioSegment.from_wav(filepath)
             logger.info(f"Playing {filepath}, duration: {len(audio)/1000:.2f}s")
@@ -176,10 +309,31 @@ class AudioPlayer:
         Play audio from bytes data.
         
         Args:
-            audio_data: Audio data as bytes
+            audio_data: Raw 16-bit PCM audio data
             channels: Number of audio channels
             rate: Sample rate in Hz
         """
+        try:
+            stream = AudioPlayer._get_pyaudio().open(
+                format=pyaudio.paInt16,
+                channels=channels,
+                rate=rate,
+                output=True
+            )
+        except Exception as e:
+            logger.warning(f"Cannot open output stream, falling back to WAV file: {e}")
+            stream = None
+            
+        if stream:
+            try:
+                stream.write(audio_data)
+                stream.stop_stream()
+            except Exception as e:
+                logger.error(f"Failed to play audio bytes: {e}")
+            finally:
+                stream.close()
+            return
+            
         try:
             # Create temporary file
             with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
@@ -208,21 +362,27 @@ class AudioPlayer:
 class VoiceActivityDetector:
     """Simple voice activity detector to detect speech."""
     
-    def __init__(self, threshold=500, min_silence_duration=1.0, sample_rate=8000):
+    def __init__(self, threshold=500, min_silence_duration=1.0, sample_rate=8000, smoothing=0.3):
         """
         Initialize voice activity detector.
         
         Args:
-            threshold: Energy threshold to consider as speech
+            threshold: RMS energy threshold to consider as speech
             min_silence_duration: Minimum silence duration in seconds to end detection
             sample_rate: Audio sample rate in Hz
+            smoothing: EWMA weight of each new 10 ms window's energy (0..1]
         """
         self.threshold = threshold
         self.min_silence_duration = min_silence_duration
         self.sample_rate = sample_rate
+        self.smoothing = smoothing
         self.silent_frames = 0
         self.speaking = False
         
+        # Smoothed energy carried across chunks
+        self._window = max(1, sample_rate * VAD_WINDOW_MS // 1000)
+        self._level = 0.0
+        
     def is_speech(self, audio_chunk: bytes) -> bool:
         """
         Check if audio chunk contains speech.
@@ -236,11 +396,11 @@ class VoiceActivityDetector:
         # Convert bytes to numpy array
         audio_data = np.frombuffer(audio_chunk, dtype=np.int16)
         
-        # Calculate energy
-        energy = np.sum(np.abs(audio_data)) / len(audio_data)
+        # Peak of the smoothed 10 ms RMS energy; brief spikes are damped by the EWMA
+        peak, self._level = smoothed_rms_peak(audio_data, self._window, self.smoothing, self._level)
         
         # Check if energy is above threshold
-        is_above_threshold = energy > self.threshold
+        is_above_threshold = peak > self.threshold
         
         # Update state based on energy
         if is_above_threshold:
@@ -260,4 +420,5 @@ class VoiceActivityDetector:
     def reset(self):
         """Reset the detector state."""
         self.silent_frames = 0
-        self.speaking = False
\ No newline at end of file
+        self.speaking = False
+        self._level = 0.0
\ No newline at end of file
@@ -2,10 +2,39 @@
 Logging utilities for the Medical AI Agent.
 """
 import os
+import queue
+import atexit
 import logging
 import datetime
+import threading
+from collections import deque
+from itertools import islice
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+# Recent conversation entries kept in memory for get_conversation_history
+HISTORY_SIZE = 256
+
+# Background listener that writes queued log records to the real handlers
+_listener = None
+
+
+def _stop_listener():
+    """Flush queued records and stop the log listener."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
 
 def setup_logging(log_level=None, log_file=None):
     """
@@ -39,6 +68,7 @@ def setup_logging(log_level=None, log_file=None):
     root_logger.setLevel(log_level)
     
     # Remove existing handlers
+    _stop_listener()
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
     
@@ -59,20 +89,31 @@ def setup_logging(log_level=None, log_file=None):
     )
     file_handler.setLevel(log_level)
     file_handler.setFormatter(file_formatter)
-    root_logger.addHandler(file_handler)
     
     # Configure console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(log_level)
     console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
+    
+    # Callers only enqueue records; file and console output happen in the
+    # listener thread so disk latency never blocks audio or request threads
+    global _listener
+    log_queue = queue.Queue(-1)
+    root_logger.addHandler(QueueHandler(log_queue))
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
     
     logging.info(f"Logging initialized (level: {logging.getLevelName(log_level)}, file: {log_file})")
     return root_logger
 
 
 class ConversationLogger:
-    """Logger for conversation history."""
+    """
+    Logger for conversation history.
+    
+    With msgpack installed the log is a stream of msgpack records
+    ({"t", "role", "text"}) in a .mpk file, otherwise plain text in a .txt file.
+    """
     
     def __init__(self, log_dir=None):
         """
@@ -89,30 +130,79 @@ class ConversationLogger:
         
         # Create a new conversation file with timestamp
         timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        self.log_file = os.path.join(log_dir, f'conversation_{timestamp}.txt')
+        extension = 'mpk' if HAS_MSGPACK else 'txt'
+        self.log_file = os.path.join(log_dir, f'conversation_{timestamp}.{extension}')
+        
+        # Recent (speaker, text) entries, so history queries never re-read the file
+        self._history = deque(maxlen=HISTORY_SIZE)
         
-        # Create the file
-        with open(self.log_file, 'w', encoding='utf-8') as f:
-            f.write(f"Conversation started at {datetime.datetime.now()}\n")
-            f.write("-" * 80 + "\n\n")
+        # Create the file and keep it open (unbuffered/line-buffered) for the whole conversation
+        self._lock = threading.Lock()
+        if HAS_MSGPACK:
+            self._packer = msgpack.Packer()
+            self._fh = open(self.log_file, 'wb', buffering=0)
+            self._fh.write(self._packer.pack({
+                "t": datetime.datetime.now().isoformat(timespec='seconds'),
+                "role": "SYSTEM",
+                "text": "Conversation started"
+            }))
+        else:
+            self._packer = None
+            self._fh = open(self.log_file, 'w', encoding='utf-8', buffering=1)
+            self._fh.write(f"Conversation started at {datetime.datetime.now()}\n")
+            self._fh.write("-" * 80 + "\n\n")
+        atexit.register(self.close)
+    
+    def _write(self, speaker, text):
+        """Append one entry to the log file and the in-memory history."""
+        now = datetime.datetime.now()
+        with self._lock:
+            # Multi-line text is kept as one entry, lines joined with spaces
+            self._history.append((speaker, " ".join(line.strip() for line in text.splitlines() if line.strip())))
+            if not self._fh:
+                return
+            if self._packer:
+                self._fh.write(self._packer.pack({"t": now.isoformat(timespec='seconds'), "role": speaker, "text": text}))
+            else:
+                self._fh.write(f"{speaker} ({now:%H:%M:%S}): {text}\n\n")
     
     def log_user_input(self, text):
         """Log user input."""
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(f"USER ({datetime.datetime.now().strftime('%H:%M:%S')}): {text}\n\n")
+        self._write("USER", str(text))
     
     def log_system_event(self, event_type, details=None):
         """Log system event."""
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(f"SYSTEM ({datetime.datetime.now().strftime('%H:%M:%S')}): {event_type}")
-            if details:
-                f.write(f" - {details}")
-            f.write("\n\n")
+        text = f"{event_type}"
+        if details:
+            text += f" - {details}"
+        self._write("SYSTEM", text)
     
     def log_agent_response(self, text):
         """Log agent response."""
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(f"AGENT ({datetime.datetime.now().strftime('%H:%M:%S')}): {text}\n\n")
+        self._write("AGENT", str(text))
+    
+    def close(self):
+        """Close the conversation log file."""
+        with self._lock:
+            if self._fh:
+                self._fh.close()
+                self._fh = None
+    
+    @staticmethod
+    def read_log(log_file):
+        """
+        Read records of a msgpack conversation log.
+        
+        Args:
+            log_file: Path to a .mpk conversation log
+            
+        Yields:
+            Records as dicts with "t", "role" and "text"
+        """
+        if not HAS_MSGPACK:
+            raise ImportError("msgpack is required to read .mpk conversation logs (pip install msgpack)")
+        with open(log_file, 'rb') as f:
+            yield from msgpack.Unpacker(f, raw=False)
     
     def get_conversation_history(self, max_entries=10):
         """
@@ -124,51 +214,6 @@ class ConversationLogger:
         Returns:
             List of conversation entries
         """
-        history = []
-        
-        with open(self.log_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        current_entry = []
-        current_speaker = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("-" * 10):
-                continue
-                
-            if line.startswith("USER") or line.startswith("AGENT") or line.startswith("SYSTEM"):
-                # If we have a previous entry, add it to history
-                if current_entry and current_speaker:
-                    history.append((current_speaker, " ".join(current_entry)))
-                    current_entry = []
-                
-                # Extract the speaker from the current line
-                if line.startswith("USER"):
-                    current_speaker = "USER"
-                    # Remove the USER prefix
-                    content = line[line.find(":")+1:].strip()
-                    if content:
-                        current_entry.append(content)
-                elif line.startswith("AGENT"):
-                    current_speaker = "AGENT"
-                    # Remove the AGENT prefix
-                    content = line[line.find(":")+1:].strip()
-                    if content:
-                        current_entry.append(content)
-                elif line.startswith("SYSTEM"):
-                    current_speaker = "SYSTEM"
-                    # Remove the SYSTEM prefix
-                    content = line[line.find(":")+1:].strip()
-                    if content:
-                        current_entry.append(content)
-            else:
-                # Continuation of the current entry
-                current_entry.append(line)
-        
-        # Add the last entry if it exists
-        if current_entry and current_speaker:
-            history.append((current_speaker, " ".join(current_entry)))
-        
-        # Return the most recent entries, limited by max_entries
-        return history[-max_entries:]
\ No newline at end of file
+        with self._lock:
+            start = max(0, len(self._history) - max_entries)
+            return list(islice(self._history, start, None))
\ No newline at end of file